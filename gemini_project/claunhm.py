@@ -1,16 +1,25 @@
+import argparse
+import heapq
 import json
+import math
 import os
+import pickle
+import sys
+import tempfile
 import threading
+import time
+import uuid
 import subprocess
 import webbrowser
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog
 from tkinter import ttk
 from tkinterdnd2 import TkinterDnD, DND_FILES
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Attempt to import required libraries ---
 try:
-    from PIL import Image, ImageDraw
+    from PIL import Image, ImageDraw, ImageTk
     import pystray
     from pynput import keyboard
 except ImportError as e:
@@ -23,50 +32,494 @@ except ImportError as e:
 # --- Constants ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(SCRIPT_DIR, 'config.json')
+LAUNCH_LOG_PATH = os.path.join(SCRIPT_DIR, 'launch_log.tsv')
 HOTKEY_COMBINATION = {keyboard.Key.ctrl, keyboard.Key.shift, keyboard.KeyCode.from_char('L')}
 
-# --- Helper Functions (outside class) ---
-def load_data():
-    if not os.path.exists(CONFIG_PATH):
-        return {"shortcuts": {}, "settings": {}}
-    try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+# --- Helpers shared with the tools in the parent folder ---
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+from journal_file import trim_torn_tail
+
+# Optional: icon cache shared with the launcher
+try:
+    from icon_cache import IconCache, ICON_SIZE
+except ImportError:
+    IconCache = None # buttons stay text-only
+
+# --- Config Persistence ---
+def _migrate_0_to_1(data):
+    # Very old files were a flat list of shortcuts; ids were added when tabs became keyed by id
+    if isinstance(data, list):
+        data = {"shortcuts": {"基本": data}}
+    data.setdefault("shortcuts", {})
+    data.setdefault("settings", {})
+    for shortcuts in data["shortcuts"].values():
+        for shortcut in shortcuts:
+            if not shortcut.get("id"):
+                shortcut["id"] = new_shortcut_id()
+    return data
+
+def _migrate_1_to_2(data):
+    # Launch counts moved from settings to the launch log
+    data["settings"].pop("launch_counts", None)
+    return data
+
+class ConfigStore:
+    """
+    config.json plus an append-only journal (one JSON change record per line).
+    Edits are journaled immediately, so a crash loses nothing; the journal is folded
+    back into config.json every COMPACT_AFTER records and on exit. A pickle of the
+    loaded data is kept next to it and used while config.json is unchanged.
+    """
+    SCHEMA_VERSION = 2
+    MIGRATIONS = {0: _migrate_0_to_1, 1: _migrate_1_to_2} # version -> step to version + 1
+    COMPACT_AFTER = 200
+
+    def __init__(self, path):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.journal_path = base + ".journal"
+        self.cache_path = base + ".cache"
+        self.data = None
+        self.journal_records = 0
+        self.load_failed = False # keep an unreadable config.json instead of overwriting it
+
+    @staticmethod
+    def empty():
+        return {"schema_version": ConfigStore.SCHEMA_VERSION, "shortcuts": {}, "settings": {}}
+
+    def _signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_base(self):
+        if not os.path.exists(self.path):
+            return self.empty()
+        signature = self._signature()
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cached_signature, data = pickle.load(f)
+            if cached_signature == signature:
+                return self.migrate(data)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            pass # no usable cache; fall back to the JSON file
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return self.migrate(json.load(f))
+
+    @classmethod
+    def migrate(cls, data):
+        version = data.get("schema_version", 0) if isinstance(data, dict) else 0
+        if version > cls.SCHEMA_VERSION:
+            raise ValueError(f"新しいバージョンの設定ファイルです (schema_version={version})")
+        if version < cls.SCHEMA_VERSION:
+            while version < cls.SCHEMA_VERSION:
+                data = cls.MIGRATIONS[version](data)
+                version += 1
+            data["_migrated"] = True
+        data["schema_version"] = version
         return data
-    except (json.JSONDecodeError, IOError) as e:
-        messagebox.showerror("設定エラー", f"config.jsonの読み込みエラー: {e}")
-        return {"shortcuts": {}, "settings": {}}
-
-def save_data(data):
-    try:
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        messagebox.showerror("保存エラー", f"config.jsonの保存エラー: {e}")
-
-def launch_item(path):
-    try:
-        if path.startswith(("http://", "https://")):
-            webbrowser.open(path)
+
+    @staticmethod
+    def apply(data, record):
+        # Records are idempotent, so replaying a journal that was already compacted is harmless
+        shortcuts = data["shortcuts"]
+        op = record["op"]
+        if op == "add":
+            entries = shortcuts.setdefault(record["category"], [])
+            if all(sc["id"] != record["shortcut"]["id"] for sc in entries):
+                entries.append(record["shortcut"])
+        elif op == "delete":
+            entries = shortcuts.get(record["category"], [])
+            entries[:] = [sc for sc in entries if sc["id"] != record["id"]]
+            if not entries: shortcuts.pop(record["category"], None)
+        elif op == "rename_category":
+            if record["old"] in shortcuts and record["new"] not in shortcuts:
+                shortcuts[record["new"]] = shortcuts.pop(record["old"])
+        elif op == "delete_category":
+            shortcuts.pop(record["category"], None)
+
+    def load(self):
+        self.load_failed = False
+        try:
+            self.data = self._read_base()
+        except (json.JSONDecodeError, OSError, ValueError, AttributeError) as e:
+            messagebox.showerror("設定エラー", f"config.jsonの読み込みエラー: {e}")
+            self.data = self.empty()
+            self.load_failed = True
+        migrated = self.data.pop("_migrated", False)
+        self.journal_records = 0
+        # A crash can leave the last record half written; drop it so the next append starts on its own line
+        try:
+            trim_torn_tail(self.journal_path)
+        except OSError as e:
+            print(f"ジャーナルの修復エラー: {e}")
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.apply(self.data, json.loads(line))
+                        self.journal_records += 1
+                    except (ValueError, KeyError):
+                        pass # a record that cannot be applied
+        except FileNotFoundError:
+            pass
+        # Migrations may assign ids, which journal records refer to, so persist them right away
+        if migrated or self.journal_records >= self.COMPACT_AFTER:
+            self.compact()
+        return self.data
+
+    def append(self, record):
+        """Journal one edit that has already been applied to self.data."""
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            messagebox.showerror("保存エラー", f"変更の記録に失敗しました: {e}")
+            return
+        self.journal_records += 1
+        if self.journal_records >= self.COMPACT_AFTER:
+            self.compact()
+
+    def compact(self):
+        """Write the whole config atomically, refresh the cache and empty the journal."""
+        if self.load_failed: return
+        directory = os.path.dirname(self.path) or "."
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # The journal is only cleared after config.json is safely replaced
+            open(self.journal_path, 'w').close()
+            self.journal_records = 0
+            with open(self.cache_path, 'wb') as f:
+                pickle.dump((self._signature(), self.data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            messagebox.showerror("保存エラー", f"config.jsonの保存エラー: {e}")
+
+def bench_load(count):
+    # --bench-load: time loading `count` shortcuts through each path of ConfigStore
+    with tempfile.TemporaryDirectory() as directory:
+        store = ConfigStore(os.path.join(directory, "config.json"))
+        store.load()
+        for i in range(count):
+            store.data["shortcuts"].setdefault(f"カテゴリ{i % 50}", []).append(
+                {"id": new_shortcut_id(), "name": f"ショートカット {i}", "path": f"C:/Program Files/App{i}/app{i}.exe"})
+        start = time.perf_counter(); store.compact(); compact_time = time.perf_counter() - start
+        size_kb = os.path.getsize(store.path) / 1024
+
+        start = time.perf_counter(); ConfigStore(store.path).load(); cached_time = time.perf_counter() - start
+        os.remove(store.cache_path)
+        start = time.perf_counter(); ConfigStore(store.path).load(); json_time = time.perf_counter() - start
+
+        journal = ConfigStore(store.path)
+        journal.COMPACT_AFTER = count * 10 # keep the records for the replay measurement
+        journal.load()
+        for i in range(100):
+            shortcut = {"id": new_shortcut_id(), "name": f"追加 {i}", "path": f"C:/extra{i}.exe"}
+            journal.data["shortcuts"]["カテゴリ0"].append(shortcut)
+            journal.append({"op": "add", "category": "カテゴリ0", "shortcut": shortcut})
+        start = time.perf_counter(); ConfigStore(store.path).load(); replay_time = time.perf_counter() - start
+
+        print(f"{count} 件 (config.json {size_kb:.0f} KB)")
+        print(f"  圧縮 (JSON + キャッシュ書き込み): {compact_time * 1000:.1f} ms")
+        print(f"  読み込み (キャッシュ):             {cached_time * 1000:.1f} ms")
+        print(f"  読み込み (JSON):                   {json_time * 1000:.1f} ms")
+        print(f"  読み込み (JSON + 変更記録 100 件): {replay_time * 1000:.1f} ms")
+
+def new_shortcut_id():
+    return uuid.uuid4().hex[:12]
+
+def open_item(path):
+    if path.startswith(("http://", "https://")):
+        webbrowser.open(path)
+    else:
+        os.startfile(os.path.abspath(os.path.join(SCRIPT_DIR, path)))
+
+def dry_run_open(path):
+    # Stand-in for open_item (--dry-run): nothing is opened, so launches can be tried on any OS.
+    # Paths that do not exist fail like os.startfile would.
+    if not path.startswith(("http://", "https://")) and not os.path.exists(os.path.join(SCRIPT_DIR, path)):
+        raise FileNotFoundError(f"ファイルが見つかりません: {path}")
+    print(f"[dry-run] 起動: {path}")
+
+def launch_item(path, opener=open_item):
+    # Returns the seconds it took to hand the item to the OS; errors are raised to the caller
+    start = time.perf_counter()
+    opener(path)
+    return time.perf_counter() - start
+
+# --- Launch Statistics ---
+class LaunchStats:
+    """
+    Append-only launch log with exponentially decayed (frecency) scores per shortcut.
+    Log lines are tab separated:
+      L  time  id  ms  path   one launch
+      S  id  score  time  count   compacted score of a shortcut at `time`
+      D  id   shortcut deleted
+    The file is only read on the first call that needs scores.
+    """
+    HALF_LIFE = 14 * 24 * 3600  # a launch counts half as much after two weeks
+    COMPACT_AFTER = 500         # launch lines before the log is rewritten as S lines
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.scores = None  # id -> (score, reference time, launch count); None until loaded
+        self.raw_lines = 0
+        self.tail_checked = False  # records may be appended before the log is read
+
+    def _decayed(self, score, since, now):
+        return score * 0.5 ** ((now - since) / self.HALF_LIFE)
+
+    def _apply(self, fields):
+        kind = fields[0]
+        if kind == "L":
+            ts, shortcut_id = float(fields[1]), fields[2]
+            score, since, count = self.scores.get(shortcut_id, (0.0, ts, 0))
+            self.scores[shortcut_id] = (self._decayed(score, since, ts) + 1.0, ts, count + 1)
+            self.raw_lines += 1
+        elif kind == "S":
+            self.scores[fields[1]] = (float(fields[2]), float(fields[3]), int(fields[4]))
+        elif kind == "D":
+            self.scores.pop(fields[1], None)
+
+    def _check_tail(self):
+        # Drop a line cut short by a crash once, before the first read or append, so no record is glued onto it
+        if self.tail_checked: return
+        self.tail_checked = True
+        try:
+            trim_torn_tail(self.path)
+        except OSError as e:
+            print(f"起動履歴の修復エラー: {e}")
+
+    def _ensure_loaded(self):
+        if self.scores is not None: return
+        self._check_tail()
+        self.scores = {}
+        self.raw_lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._apply(line.rstrip('\n').split('\t', 4))
+                    except (ValueError, IndexError):
+                        pass # skip a malformed line
+        except FileNotFoundError:
+            pass
+        if self.raw_lines >= self.COMPACT_AFTER:
+            self._compact()
+
+    def _append(self, line):
+        self._check_tail()
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            print(f"起動履歴の書き込みエラー: {e}")
+
+    def _compact(self):
+        now = time.time()
+        lines = [f"S\t{sid}\t{self._decayed(score, since, now):.6g}\t{now:.0f}\t{count}\n"
+                 for sid, (score, since, count) in self.scores.items()]
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            os.replace(tmp_path, self.path)
+            self.raw_lines = 0
+        except OSError as e:
+            print(f"起動履歴の圧縮エラー: {e}")
+
+    def load(self):
+        with self.lock:
+            self._ensure_loaded()
+
+    def record(self, shortcut_id, path, duration):
+        # Safe to call from any thread
+        now = time.time()
+        line = f"L\t{now:.0f}\t{shortcut_id}\t{duration * 1000:.0f}\t{path}\n"
+        with self.lock:
+            self._append(line)
+            if self.scores is not None:
+                self._apply(line.rstrip('\n').split('\t', 4))
+                if self.raw_lines >= self.COMPACT_AFTER:
+                    self._compact()
+
+    def forget(self, shortcut_id):
+        with self.lock:
+            self._append(f"D\t{shortcut_id}\n")
+            if self.scores is not None:
+                self.scores.pop(shortcut_id, None)
+
+    def frecency(self):
+        """Current decayed score of every launched shortcut (loads the log if needed)."""
+        now = time.time()
+        with self.lock:
+            self._ensure_loaded()
+            return {sid: self._decayed(score, since, now) for sid, (score, since, count) in self.scores.items()}
+
+# --- Search Index ---
+def char_mask(text):
+    # 64-bit bitmask of the characters in `text`, used to skip entries that cannot match.
+    # a-z and 0-9 get their own bits; everything else shares the remaining 28.
+    mask = 0
+    for ch in text:
+        if 'a' <= ch <= 'z': mask |= 1 << (ord(ch) - 97)
+        elif '0' <= ch <= '9': mask |= 1 << (ord(ch) - 22)
+        else: mask |= 1 << (36 + ord(ch) % 28)
+    return mask
+
+def ngrams(text, n=3):
+    # All substrings of length 1..n; a query of up to n chars is looked up directly
+    return {text[i:i + k] for k in range(1, n + 1) for i in range(len(text) - k + 1)}
+
+def path_search_key(path):
+    # Only the file name without extension (or the URL without its scheme) is searched;
+    # shared parts like "C:/Program Files" or ".exe" would match almost every query.
+    if path.startswith(("http://", "https://")):
+        return path.split("://", 1)[1].lower()
+    return os.path.splitext(os.path.basename(path.rstrip("/\\")))[0].lower()
+
+def word_initials(text):
+    return {text[i] for i in range(len(text)) if text[i].isalnum() and (i == 0 or not text[i - 1].isalnum())}
+
+def subsequence_gaps(query, text):
+    # Number of skipped characters when `query` is matched as a subsequence of `text`, or None
+    pos, gaps = -1, 0
+    for ch in query:
+        found = text.find(ch, pos + 1)
+        if found < 0:
+            return None
+        gaps += found - pos - 1
+        pos = found
+    return gaps
+
+class SearchIndex:
+    """In-memory fuzzy index over shortcut names and paths, updated incrementally."""
+    def __init__(self):
+        self.entries = {}   # shortcut id -> (category, name, path, name_lower, path key, char mask)
+        self.postings = {}  # 1-3 char gram -> set of shortcut ids
+        self.initials = {}  # first char of a word in the name -> set of shortcut ids
+
+    def add(self, shortcut_id, category, name, path):
+        self.remove(shortcut_id)
+        name_l, path_l = name.lower(), path_search_key(path)
+        self.entries[shortcut_id] = (category, name, path, name_l, path_l, char_mask(name_l + path_l))
+        for gram in ngrams(name_l) | ngrams(path_l):
+            self.postings.setdefault(gram, set()).add(shortcut_id)
+        for ch in word_initials(name_l):
+            self.initials.setdefault(ch, set()).add(shortcut_id)
+
+    def remove(self, shortcut_id):
+        entry = self.entries.pop(shortcut_id, None)
+        if entry is None: return
+        for gram in ngrams(entry[3]) | ngrams(entry[4]):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(shortcut_id)
+                if not ids: del self.postings[gram]
+        for ch in word_initials(entry[3]):
+            ids = self.initials.get(ch)
+            if ids is not None:
+                ids.discard(shortcut_id)
+                if not ids: del self.initials[ch]
+
+    def search(self, query, limit=20, boost=None):
+        """Return up to `limit` shortcut ids, best first. `boost` maps id -> extra (frequency) score."""
+        query = query.strip().lower()
+        if not query: return []
+        scored = {}
+
+        # Substring matches: only ids that contain every trigram of the query (smallest set first).
+        # A single character only matches the start of a word in the name.
+        if len(query) == 1:
+            candidates = self.initials.get(query, ())
+        elif len(query) <= 3:
+            candidates = self.postings.get(query, ())
         else:
-            os.startfile(os.path.abspath(os.path.join(SCRIPT_DIR, path)))
-    except Exception as e:
-        messagebox.showerror("起動エラー", f"起動エラー: {path}\n{e}")
+            posting_sets = sorted((self.postings.get(query[i:i + 3], set()) for i in range(len(query) - 2)), key=len)
+            candidates = set(posting_sets[0]).intersection(*posting_sets[1:])
+        entries = self.entries
+        for shortcut_id in candidates:
+            entry = entries[shortcut_id]
+            name_l = entry[3]
+            pos = name_l.find(query)
+            if pos >= 0:
+                # Name-initial and word-initial matches in shorter names rank higher
+                # (single-char candidates always have a word starting with the query)
+                if pos == 0: bonus = 50
+                elif len(query) == 1 or not name_l[pos - 1].isalnum(): bonus = 25
+                else: bonus = 0
+                scored[shortcut_id] = 100 + bonus - len(name_l) * 0.1
+            elif query in entry[4]:
+                scored[shortcut_id] = 60 - len(entry[4]) * 0.05
+
+        # Fuzzy (subsequence) matches: linear scan behind the char-mask prefilter
+        if len(scored) < limit and len(query) > 1:
+            mask = char_mask(query)
+            for shortcut_id, entry in entries.items():
+                if entry[5] & mask != mask or shortcut_id in scored: continue
+                gaps = subsequence_gaps(query, entry[3])
+                if gaps is not None:
+                    scored[shortcut_id] = 40 - gaps
+                    continue
+                gaps = subsequence_gaps(query, entry[4])
+                if gaps is not None:
+                    scored[shortcut_id] = 20 - gaps * 0.2
+
+        if boost:
+            for shortcut_id, bonus in boost.items():
+                if shortcut_id in scored:
+                    scored[shortcut_id] += bonus
+        return heapq.nlargest(limit, scored, key=scored.get)
+
+# --- View Model ---
+class CategoryView:
+    """Widgets of one category tab, keyed by shortcut id so a refresh only patches what changed."""
+    def __init__(self, category, frame, inner):
+        self.category = category
+        self.frame = frame
+        self.inner = inner      # scrollable frame that holds the buttons
+        self.buttons = {}       # shortcut id -> ttk.Button
+        self.rendered = {}      # shortcut id -> (name, path, row) last applied to the button
 
 # --- Main Application Class ---
 class MiniLauncher(TkinterDnD.Tk):
-    def __init__(self):
+    def __init__(self, opener=open_item):
         super().__init__()
         self.withdraw() # Start hidden
         self.title("ミニランチャー")
         self.geometry("600x500")
         self.protocol("WM_DELETE_WINDOW", self.hide_window)
 
-        self.data = load_data()
-        self.shortcuts_data = self.data.get("shortcuts", {})
-        self.settings_data = self.data.get("settings", {})
+        self.store = ConfigStore(CONFIG_PATH)
+        self.data = self.store.load()
+        self.shortcuts_data = self.data["shortcuts"]
+        self.settings_data = self.data["settings"]
         self.hotkey_listener = None
         self.tray_icon = None
+        self.category_views = {} # category -> CategoryView
+        self.info_tab = None
+        self.launch_stats = LaunchStats(LAUNCH_LOG_PATH)
+        self.frecency = {}     # shortcut id -> decayed launch score (filled once the log is loaded)
+        self.launch_boost = {} # shortcut id -> search ranking bonus
+        self.opener = opener
+        self.launch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="launch")
+        self.launch_errors = 0
+        self.status_clear_id = None
+        self.icon_cache = IconCache(SCRIPT_DIR) if IconCache else None
+        self.icon_images = {}  # icon path -> PhotoImage (kept referenced so Tk does not drop it)
+        self.icon_buttons = {} # icon path -> buttons showing that icon
+        self.blank_icon = None
+        self.search_index = SearchIndex()
+        self.search_results = []
+        for category, shortcuts in self.shortcuts_data.items():
+            for shortcut in shortcuts:
+                self.search_index.add(shortcut['id'], category, shortcut['name'], shortcut['path'])
 
         self._setup_styles()
         self._create_widgets()
@@ -74,6 +527,10 @@ class MiniLauncher(TkinterDnD.Tk):
         self._setup_tray_icon()
         self._setup_hotkeys()
         self.show_window() # Show after setup
+        threading.Thread(target=self._load_launch_stats, daemon=True).start()
+        if self.icon_cache:
+            self.icon_cache.warm({self._icon_source(sc['path']) for scs in self.shortcuts_data.values() for sc in scs},
+                                 lambda path, image: self.after(0, lambda: self._apply_icon(path, image)))
 
     def _setup_styles(self):
         style = ttk.Style(self)
@@ -85,6 +542,8 @@ class MiniLauncher(TkinterDnD.Tk):
         main_frame = ttk.Frame(self, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
 
+        self._create_search_box(main_frame)
+
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
         self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_change)
@@ -92,6 +551,103 @@ class MiniLauncher(TkinterDnD.Tk):
 
         self._create_registration_form(main_frame)
 
+        self.status_var = tk.StringVar()
+        self.status_label = ttk.Label(main_frame, textvariable=self.status_var, anchor="w")
+        self.status_label.pack(fill=tk.X, pady=(5, 0))
+
+    def _create_search_box(self, parent):
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=('Yu Gothic UI', 11))
+        self.search_entry.pack(fill=tk.X)
+        self.search_entry.bind("<Return>", lambda e: self._launch_search_result())
+        self.search_entry.bind("<Down>", lambda e: self._move_search_selection(1))
+        self.search_entry.bind("<Up>", lambda e: self._move_search_selection(-1))
+        self.search_entry.bind("<Escape>", lambda e: self._clear_search())
+        self.search_listbox = tk.Listbox(search_frame, height=8, activestyle="none", font=('Yu Gothic UI', 10))
+        self.search_listbox.bind("<Double-Button-1>", lambda e: self._launch_search_result())
+        self.search_var.trace_add("write", lambda *args: self._update_search_results())
+
+    def _update_search_results(self):
+        query = self.search_var.get()
+        self.search_results = self.search_index.search(query, boost=self.launch_boost)
+        self.search_listbox.delete(0, tk.END)
+        for shortcut_id in self.search_results:
+            category, name = self.search_index.entries[shortcut_id][:2]
+            self.search_listbox.insert(tk.END, f"{name}    [{category}]")
+        if self.search_results:
+            self.search_listbox.selection_set(0)
+            self.search_listbox.pack(fill=tk.X, pady=(5, 0))
+        else:
+            self.search_listbox.pack_forget()
+
+    def _move_search_selection(self, step):
+        if not self.search_results: return "break"
+        current = self.search_listbox.curselection()
+        index = min(max((current[0] if current else 0) + step, 0), len(self.search_results) - 1)
+        self.search_listbox.selection_clear(0, tk.END)
+        self.search_listbox.selection_set(index)
+        self.search_listbox.see(index)
+        return "break"
+
+    def _launch_search_result(self):
+        if not self.search_results: return
+        current = self.search_listbox.curselection()
+        shortcut_id = self.search_results[current[0] if current else 0]
+        self._launch_shortcut(shortcut_id, self.search_index.entries[shortcut_id][2])
+        self._clear_search()
+        self.hide_window()
+
+    def _clear_search(self):
+        self.search_var.set("")
+
+    def _load_launch_stats(self):
+        # Runs in the background after the window is up; the buttons are reordered when done
+        frecency = self.launch_stats.frecency()
+        self.after(0, lambda: self._apply_frecency(frecency))
+
+    def _apply_frecency(self, frecency):
+        self.frecency = frecency
+        self.launch_boost = {sid: 15 * math.log1p(score) for sid, score in frecency.items()}
+        self.refresh_notebook()
+
+    def _launch_shortcut(self, shortcut_id, path):
+        # The launch runs on the worker pool; the returned future resolves to the duration
+        future = self.launch_pool.submit(self._run_launch, shortcut_id, path)
+        future.add_done_callback(lambda f: self.after(0, lambda: self._on_launch_done(shortcut_id, path, f)))
+        return future
+
+    def _run_launch(self, shortcut_id, path):
+        duration = launch_item(path, self.opener)
+        self.launch_stats.record(shortcut_id, path, duration)
+        return duration
+
+    def _on_launch_done(self, shortcut_id, path, future):
+        # Results come back on the UI thread; failures go to the status line instead of stacking dialogs
+        error = future.exception()
+        if error is not None:
+            self.launch_errors += 1
+            suffix = f" (他 {self.launch_errors - 1} 件)" if self.launch_errors > 1 else ""
+            self._show_status(f"起動エラー: {path}: {error}{suffix}", "red")
+            return
+        score = self.frecency.get(shortcut_id, 0.0) + 1.0
+        self.frecency[shortcut_id] = score
+        self.launch_boost[shortcut_id] = 15 * math.log1p(score)
+        self._show_status(f"起動しました: {os.path.basename(path) or path} ({future.result() * 1000:.0f} ms)", "")
+
+    def _show_status(self, text, color):
+        self.status_var.set(text)
+        self.status_label.configure(foreground=color)
+        if self.status_clear_id is not None:
+            self.after_cancel(self.status_clear_id)
+        self.status_clear_id = self.after(8000, self._clear_status)
+
+    def _clear_status(self):
+        self.status_clear_id = None
+        self.launch_errors = 0
+        self.status_var.set("")
+
     def _create_registration_form(self, parent):
         reg_frame = ttk.LabelFrame(parent, text="ショートカット登録", padding="10")
         reg_frame.pack(fill=tk.X, pady=(10, 0))
@@ -117,12 +673,19 @@ class MiniLauncher(TkinterDnD.Tk):
 
         ttk.Button(reg_frame, text="登録", command=self._register_shortcut).grid(row=3, column=0, columnspan=3, sticky="ew", padx=5, pady=10)
 
-    def _create_shortcut_context_menu(self, category, index):
+    def _find_shortcut(self, category, shortcut_id):
+        for index, shortcut in enumerate(self.shortcuts_data.get(category, [])):
+            if shortcut['id'] == shortcut_id:
+                return index
+        return None
+
+    def _create_shortcut_context_menu(self, category, shortcut_id):
+        index = self._find_shortcut(category, shortcut_id)
         menu = tk.Menu(self, tearoff=0)
-        menu.add_command(label="起動", command=lambda: launch_item(self.shortcuts_data[category][index]['path']))
+        menu.add_command(label="起動", command=lambda: self._launch_shortcut(shortcut_id, self.shortcuts_data[category][index]['path']))
         menu.add_separator()
-        menu.add_command(label="編集", command=lambda: self._edit_shortcut(category, index))
-        menu.add_command(label="削除", command=lambda: self._delete_shortcut(category, index))
+        menu.add_command(label="編集", command=lambda: self._edit_shortcut(category, shortcut_id))
+        menu.add_command(label="削除", command=lambda: self._delete_shortcut(category, shortcut_id))
         return menu
 
     def _show_category_context_menu(self, event):
@@ -144,9 +707,9 @@ class MiniLauncher(TkinterDnD.Tk):
             # This error occurs if the click is not on a tab, so we can safely ignore it.
             pass
 
-    def _populate_tab(self, tab_frame, category):
-        for widget in tab_frame.winfo_children():
-            widget.destroy()
+    def _create_category_tab(self, category):
+        tab_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(tab_frame, text=category)
 
         canvas = tk.Canvas(tab_frame, borderwidth=0, background="#ffffff")
         scrollbar = ttk.Scrollbar(tab_frame, orient="vertical", command=canvas.yview)
@@ -156,15 +719,64 @@ class MiniLauncher(TkinterDnD.Tk):
         canvas.configure(yscrollcommand=scrollbar.set)
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
-
-        for i, shortcut in enumerate(self.shortcuts_data.get(category, [])):
-            btn = ttk.Button(scrollable_frame, text=shortcut['name'], width=20, command=lambda p=shortcut['path']: launch_item(p))
-            btn.grid(row=i, column=0, padx=10, pady=5, sticky="ew")
-            btn.bind("<Button-3>", lambda e, c=category, idx=i: self._create_shortcut_context_menu(c, idx).post(e.x_root, e.y_root))
         scrollable_frame.grid_columnconfigure(0, weight=1)
-
-    def refresh_notebook(self):
-        existing_tabs = [self.notebook.tab(i, "text") for i in self.notebook.tabs()]
+        return CategoryView(category, tab_frame, scrollable_frame)
+
+    def _sync_tab(self, view):
+        # Patch the buttons of one tab: drop removed ids, create new ones, and only
+        # reconfigure/regrid buttons whose name, path or position changed.
+        # Most used first; the order only changes on a refresh, not while clicking
+        shortcuts = sorted(self.shortcuts_data.get(view.category, []), key=lambda sc: -self.frecency.get(sc['id'], 0.0))
+        wanted_ids = {shortcut['id'] for shortcut in shortcuts}
+        for shortcut_id in [sid for sid in view.buttons if sid not in wanted_ids]:
+            view.buttons.pop(shortcut_id).destroy()
+            del view.rendered[shortcut_id]
+
+        for row, shortcut in enumerate(shortcuts):
+            shortcut_id = shortcut['id']
+            state = (shortcut['name'], shortcut['path'], row)
+            btn = view.buttons.get(shortcut_id)
+            if btn is None:
+                btn = ttk.Button(view.inner, width=20)
+                btn.bind("<Button-3>", lambda e, v=view, sid=shortcut_id: self._create_shortcut_context_menu(v.category, sid).post(e.x_root, e.y_root))
+                view.buttons[shortcut_id] = btn
+            elif view.rendered[shortcut_id] == state:
+                continue
+            btn.configure(text=shortcut['name'], command=lambda sid=shortcut_id, p=shortcut['path']: self._launch_shortcut(sid, p))
+            if self.icon_cache and (shortcut_id not in view.rendered or view.rendered[shortcut_id][1] != shortcut['path']):
+                icon_path = self._icon_source(shortcut['path'])
+                btn.configure(image=self._icon_image(icon_path), compound="left")
+                self.icon_buttons.setdefault(icon_path, []).append(btn)
+            btn.grid(row=row, column=0, padx=10, pady=5, sticky="ew")
+            view.rendered[shortcut_id] = state
+
+    def _icon_source(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return os.path.abspath(os.path.join(SCRIPT_DIR, path))
+
+    def _icon_image(self, icon_path):
+        # Cached icon, or a blank one while the real icon is extracted in the background
+        if icon_path not in self.icon_images:
+            image = self.icon_cache.get(icon_path)
+            if image is None:
+                self.icon_cache.request([icon_path], lambda path, img: self.after(0, lambda: self._apply_icon(path, img)))
+                if self.blank_icon is None:
+                    self.blank_icon = tk.PhotoImage(width=ICON_SIZE, height=ICON_SIZE)
+                return self.blank_icon
+            self.icon_images[icon_path] = ImageTk.PhotoImage(image)
+        return self.icon_images[icon_path]
+
+    def _apply_icon(self, icon_path, image):
+        self.icon_images[icon_path] = ImageTk.PhotoImage(image)
+        buttons = [btn for btn in self.icon_buttons.get(icon_path, []) if btn.winfo_exists()]
+        self.icon_buttons[icon_path] = buttons
+        for btn in buttons:
+            btn.configure(image=self.icon_images[icon_path])
+
+    def refresh_notebook(self, categories=None):
+        # Sync the tabs with shortcuts_data. Buttons are only patched in `categories`
+        # (None means every category); new tabs are always filled.
         all_categories = sorted(self.shortcuts_data.keys())
 
         self.category_combobox['values'] = all_categories if all_categories else ["基本"]
@@ -173,28 +785,27 @@ class MiniLauncher(TkinterDnD.Tk):
             except tk.TclError: self.category_var.set(all_categories[0])
         else: self.category_var.set("基本")
 
+        for category in [c for c in self.category_views if c not in self.shortcuts_data]:
+            view = self.category_views.pop(category)
+            self.notebook.forget(view.frame)
+            view.frame.destroy()
+
         for category in all_categories:
-            if category not in existing_tabs:
-                tab_frame = ttk.Frame(self.notebook, padding="10")
-                self.notebook.add(tab_frame, text=category)
-                self._populate_tab(tab_frame, category)
-            else:
-                for tab_id in self.notebook.tabs():
-                    if self.notebook.tab(tab_id, "text") == category:
-                        self._populate_tab(self.notebook.nametowidget(tab_id), category)
-                        break
-        
-        for tab_text in existing_tabs:
-            if tab_text not in all_categories:
-                for tab_id in self.notebook.tabs():
-                    if self.notebook.tab(tab_id, "text") == tab_text:
-                        self.notebook.forget(tab_id)
-                        break
-        
-        if not self.notebook.tabs():
-            dummy_frame = ttk.Frame(self.notebook, padding="10")
-            ttk.Label(dummy_frame, text="ショートカット未登録", justify=tk.CENTER).pack(pady=20, expand=True)
-            self.notebook.add(dummy_frame, text="情報")
+            view = self.category_views.get(category)
+            if view is None:
+                view = self.category_views[category] = self._create_category_tab(category)
+            elif categories is not None and category not in categories:
+                continue
+            self._sync_tab(view)
+
+        if all_categories and self.info_tab is not None:
+            self.notebook.forget(self.info_tab)
+            self.info_tab.destroy()
+            self.info_tab = None
+        elif not all_categories and self.info_tab is None:
+            self.info_tab = ttk.Frame(self.notebook, padding="10")
+            ttk.Label(self.info_tab, text="ショートカット未登録", justify=tk.CENTER).pack(pady=20, expand=True)
+            self.notebook.add(self.info_tab, text="情報")
 
     def _on_tab_change(self, event):
         if not self.notebook.tabs(): return
@@ -221,27 +832,40 @@ class MiniLauncher(TkinterDnD.Tk):
         if not all([path, name, category]):
             messagebox.showwarning("入力エラー", "全フィールド必須です。", parent=self)
             return
-        self.shortcuts_data.setdefault(category, []).append({"name": name, "path": path})
+        shortcut = {"id": new_shortcut_id(), "name": name, "path": path}
+        self.shortcuts_data.setdefault(category, []).append(shortcut)
+        self.store.append({"op": "add", "category": category, "shortcut": shortcut})
+        self.search_index.add(shortcut['id'], category, name, path)
         self.path_var.set("")
         self.name_var.set("")
-        self.refresh_notebook()
+        self.refresh_notebook(categories={category})
         messagebox.showinfo("登録完了", f"'{name}' を登録しました。")
 
-    def _edit_shortcut(self, category, index):
-        shortcut = self.shortcuts_data[category][index]
+    def _edit_shortcut(self, category, shortcut_id):
+        shortcut = self.shortcuts_data[category][self._find_shortcut(category, shortcut_id)]
         editor = tk.Toplevel(self)
         editor.title("編集"); editor.geometry("400x200")
         # ... (rest of the edit dialog implementation is similar to previous version)
         # This part is omitted for brevity but would be included in a full implementation.
-        # It would create a dialog, save changes, and call self.refresh_notebook()
+        # It would create a dialog, save changes, and call self.refresh_notebook(categories={category})
         pass # Placeholder for the edit shortcut dialog logic
 
-    def _delete_shortcut(self, category, index):
+    def _delete_shortcut(self, category, shortcut_id):
+        index = self._find_shortcut(category, shortcut_id)
+        if index is None: return
         shortcut = self.shortcuts_data[category][index]
         if messagebox.askyesno("削除確認", f"'{shortcut['name']}' を削除しますか？"):
             del self.shortcuts_data[category][index]
             if not self.shortcuts_data[category]: del self.shortcuts_data[category]
-            self.refresh_notebook()
+            self.store.append({"op": "delete", "category": category, "id": shortcut_id})
+            self.search_index.remove(shortcut_id)
+            self._forget_launches(shortcut_id)
+            self.refresh_notebook(categories={category})
+
+    def _forget_launches(self, shortcut_id):
+        self.launch_stats.forget(shortcut_id)
+        self.frecency.pop(shortcut_id, None)
+        self.launch_boost.pop(shortcut_id, None)
 
     def _rename_category(self, old_name):
         new_name = simpledialog.askstring("カテゴリ名変更", f"'{old_name}' の新しい名前:", parent=self)
@@ -250,12 +874,23 @@ class MiniLauncher(TkinterDnD.Tk):
                 messagebox.showwarning("名前重複", "そのカテゴリ名は既に存在します。", parent=self)
                 return
             self.shortcuts_data[new_name] = self.shortcuts_data.pop(old_name)
-            self.refresh_notebook()
+            self.store.append({"op": "rename_category", "old": old_name, "new": new_name})
+            for shortcut in self.shortcuts_data[new_name]:
+                self.search_index.add(shortcut['id'], new_name, shortcut['name'], shortcut['path'])
+            # Relabel the existing tab instead of rebuilding its buttons
+            view = self.category_views.pop(old_name)
+            view.category = new_name
+            self.category_views[new_name] = view
+            self.notebook.tab(view.frame, text=new_name)
+            self.refresh_notebook(categories=())
 
     def _delete_category(self, category_name):
         if messagebox.askyesno("カテゴリ削除確認", f"'{category_name}' とその中の全ショートカットを削除しますか？", parent=self):
-            del self.shortcuts_data[category_name]
-            self.refresh_notebook()
+            self.store.append({"op": "delete_category", "category": category_name})
+            for shortcut in self.shortcuts_data.pop(category_name):
+                self.search_index.remove(shortcut['id'])
+                self._forget_launches(shortcut['id'])
+            self.refresh_notebook(categories=())
 
     # --- Tray and Hotkey Methods ---
     def _setup_tray_icon(self):
@@ -275,7 +910,7 @@ class MiniLauncher(TkinterDnD.Tk):
 
     def _setup_hotkeys(self):
         self.hotkey_listener = keyboard.GlobalHotKeys({
-            '<ctrl>+<shift>+l': self.toggle_window
+            '<ctrl>+<shift>+l': lambda: self.after(0, self.toggle_search)
         })
         threading.Thread(target=self.hotkey_listener.run, daemon=True).start()
 
@@ -285,6 +920,15 @@ class MiniLauncher(TkinterDnD.Tk):
         else:
             self.show_window()
 
+    def toggle_search(self):
+        # Hotkey: show the window with the search box focused, or hide it if it is already up
+        if self.state() == 'normal' and self.focus_get() is self.search_entry:
+            self.hide_window()
+            return
+        self.show_window()
+        self.search_entry.focus_set()
+        self.search_entry.select_range(0, tk.END)
+
     def show_window(self):
         self.deiconify()
         self.lift()
@@ -294,14 +938,21 @@ class MiniLauncher(TkinterDnD.Tk):
         self.withdraw()
 
     def quit_application(self):
-        self.data["shortcuts"] = self.shortcuts_data
-        self.data["settings"] = self.settings_data
-        save_data(self.data)
+        self.store.compact()
+        self.launch_pool.shutdown(wait=False)
+        if self.icon_cache: self.icon_cache.save()
         if self.hotkey_listener and self.hotkey_listener.is_alive(): self.hotkey_listener.stop()
         if self.tray_icon: self.tray_icon.stop()
         self.destroy()
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    app = MiniLauncher()
+    parser = argparse.ArgumentParser(description="ミニランチャー")
+    parser.add_argument("--dry-run", action="store_true", help="実際には起動せず、起動内容を表示する")
+    parser.add_argument("--bench-load", type=int, metavar="N", help="N 件のショートカットで設定の読み込み時間を測って終了する")
+    args = parser.parse_args()
+    if args.bench_load:
+        bench_load(args.bench_load)
+        raise SystemExit
+    app = MiniLauncher(opener=dry_run_open if args.dry_run else open_item)
     app.mainloop()
@@ -0,0 +1,247 @@
+"""
+ランチャーのボタンに表示するアイコンの取り出しとキャッシュ。
+launcher.py と gemini_project/claunhm.py の両方から使う。
+
+アイコンは1枚のPNG（アトラス）にまとめて保存し、どのアイコンがどこにあるかはPNGのテキスト情報に入れる。
+起動時はこのファイルを1つ読むだけで済み、取り出し直しはバックグラウンドのスレッドで行う。
+"""
+import ctypes
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import zlib
+from PIL import Image, ImageDraw, PngImagePlugin
+
+ICON_SIZE = 16
+ATLAS_COLUMNS = 32
+ATLAS_FILE = "icon_atlas.png"
+
+if sys.platform == "win32":
+    from ctypes import wintypes
+
+    class SHFILEINFOW(ctypes.Structure):
+        _fields_ = [("hIcon", wintypes.HICON), ("iIcon", ctypes.c_int), ("dwAttributes", wintypes.DWORD),
+                    ("szDisplayName", wintypes.WCHAR * 260), ("szTypeName", wintypes.WCHAR * 80)]
+
+    class BITMAPINFOHEADER(ctypes.Structure):
+        _fields_ = [("biSize", wintypes.DWORD), ("biWidth", wintypes.LONG), ("biHeight", wintypes.LONG),
+                    ("biPlanes", wintypes.WORD), ("biBitCount", wintypes.WORD), ("biCompression", wintypes.DWORD),
+                    ("biSizeImage", wintypes.DWORD), ("biXPelsPerMeter", wintypes.LONG),
+                    ("biYPelsPerMeter", wintypes.LONG), ("biClrUsed", wintypes.DWORD), ("biClrImportant", wintypes.DWORD)]
+
+    _shell32 = ctypes.windll.shell32
+    _user32 = ctypes.windll.user32
+    _gdi32 = ctypes.windll.gdi32
+    _shell32.SHGetFileInfoW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, ctypes.POINTER(SHFILEINFOW), wintypes.UINT, wintypes.UINT]
+    _shell32.SHGetFileInfoW.restype = ctypes.c_void_p
+    _gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+    _gdi32.CreateCompatibleDC.restype = wintypes.HDC
+    _gdi32.CreateDIBSection.argtypes = [wintypes.HDC, ctypes.POINTER(BITMAPINFOHEADER), wintypes.UINT,
+                                        ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD]
+    _gdi32.CreateDIBSection.restype = wintypes.HBITMAP
+    _gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+    _gdi32.SelectObject.restype = wintypes.HGDIOBJ
+    _gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+    _gdi32.DeleteDC.argtypes = [wintypes.HDC]
+    _user32.DrawIconEx.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.HICON, ctypes.c_int, ctypes.c_int,
+                                   wintypes.UINT, wintypes.HBRUSH, wintypes.UINT]
+    _user32.DestroyIcon.argtypes = [wintypes.HICON]
+
+    SHGFI_ICON = 0x100
+    SHGFI_SMALLICON = 0x1
+    DI_MASK = 0x1
+    DI_NORMAL = 0x3
+
+def _extract_shell_icon(path, size):
+    """Windows のシェルが表示するアイコン（exe・lnk・フォルダなど）を RGBA 画像で返す。取れなければ None"""
+    info = SHFILEINFOW()
+    flags = SHGFI_ICON | (SHGFI_SMALLICON if size <= 16 else 0)
+    if not _shell32.SHGetFileInfoW(os.path.normpath(path), 0, ctypes.byref(info), ctypes.sizeof(info), flags) or not info.hIcon:
+        return None
+
+    hdc = _gdi32.CreateCompatibleDC(None)
+    header = BITMAPINFOHEADER(biSize=ctypes.sizeof(BITMAPINFOHEADER), biWidth=size, biHeight=-size,
+                              biPlanes=1, biBitCount=32, biCompression=0)
+    bits = ctypes.c_void_p()
+    hbmp = _gdi32.CreateDIBSection(hdc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+    old = _gdi32.SelectObject(hdc, hbmp)
+    try:
+        byte_count = size * size * 4
+        ctypes.memset(bits, 0, byte_count)
+        _user32.DrawIconEx(hdc, 0, 0, info.hIcon, size, size, 0, None, DI_NORMAL)
+        image = Image.frombuffer("RGBA", (size, size), ctypes.string_at(bits, byte_count), "raw", "BGRA", 0, 1).copy()
+        if image.getchannel("A").getextrema()[1] == 0:
+            # 透明度を持たない古い形式のアイコンはマスクから透明部分を作る
+            ctypes.memset(bits, 0xFF, byte_count)
+            _user32.DrawIconEx(hdc, 0, 0, info.hIcon, size, size, 0, None, DI_MASK)
+            mask = Image.frombuffer("RGBA", (size, size), ctypes.string_at(bits, byte_count), "raw", "BGRA", 0, 1)
+            image.putalpha(mask.getchannel("R").point(lambda v: 255 - v))
+        return image
+    finally:
+        _gdi32.SelectObject(hdc, old)
+        _gdi32.DeleteObject(hbmp)
+        _gdi32.DeleteDC(hdc)
+        _user32.DestroyIcon(info.hIcon)
+
+def placeholder_icon(path, size=ICON_SIZE):
+    """アイコンが取れない場合（URL・Windows以外・取得失敗）の代わりのアイコン"""
+    image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    if path.startswith(("http://", "https://")):
+        # ファビコンの代わり: 青い丸にホスト名の頭文字
+        label = path.split("://", 1)[1][:1].upper()
+        draw.ellipse((0, 0, size - 1, size - 1), fill=(66, 133, 244, 255))
+    elif os.path.isdir(path):
+        draw.rectangle((0, size // 4, size - 1, size - 2), fill=(240, 190, 60, 255))
+        draw.rectangle((0, size // 8, size // 2, size // 4), fill=(240, 190, 60, 255))
+        return image
+    else:
+        # 拡張子ごとに色を変え、ファイル名の頭文字を書く
+        label = os.path.basename(path)[:1].upper()
+        hue = zlib.crc32(os.path.splitext(path)[1].lower().encode("utf-8"))
+        color = (80 + hue % 150, 80 + (hue >> 8) % 150, 80 + (hue >> 16) % 150, 255)
+        draw.rectangle((0, 0, size - 1, size - 1), fill=color)
+    if label:
+        left, top, right, bottom = draw.textbbox((0, 0), label)
+        draw.text(((size - (right - left)) / 2 - left, (size - (bottom - top)) / 2 - top), label, fill=(255, 255, 255, 255))
+    return image
+
+def extract_icon(path, size=ICON_SIZE):
+    if sys.platform == "win32" and not path.startswith(("http://", "https://")) and os.path.exists(path):
+        try:
+            image = _extract_shell_icon(path, size)
+            if image is not None:
+                return image
+        except (OSError, ValueError, ctypes.ArgumentError) as e:
+            print(f"アイコンの取得に失敗: {path}: {e}")
+    return placeholder_icon(path, size)
+
+def _mtime(path):
+    """キャッシュのキー。URLは 0、存在しないファイルは -1（作られたら取り出し直す）"""
+    if path.startswith(("http://", "https://")):
+        return 0
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+class IconCache:
+    """
+    パス → アイコン画像 のキャッシュ。キャッシュは パス + 更新日時 で判定する。
+    get() はキャッシュ済みの画像をすぐ返し、request()/warm() はワーカースレッドで取り出して
+    on_ready(path, image) を呼ぶ（ワーカースレッドから呼ばれるので、UIへの反映は呼び出し側で after を使う）。
+    """
+    def __init__(self, cache_dir, size=ICON_SIZE):
+        self.atlas_path = os.path.join(cache_dir, ATLAS_FILE)
+        self.size = size
+        self.icons = {} # path -> (mtime, PIL.Image)
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock() # save() はワーカースレッドと終了処理の両方から呼ばれる
+        self.dirty = False
+        self.jobs = queue.Queue()
+        self.worker = None
+        self._load()
+
+    def _load(self):
+        try:
+            with Image.open(self.atlas_path) as atlas:
+                index = json.loads(atlas.text.get("icons", "{}"))
+                if index.get("size") != self.size:
+                    return
+                atlas = atlas.convert("RGBA")
+        except (OSError, ValueError) as e:
+            if os.path.exists(self.atlas_path):
+                print(f"アイコンキャッシュの読み込みに失敗: {e}")
+            return
+        columns = index.get("columns", ATLAS_COLUMNS)
+        for path, (mtime, slot) in index.get("entries", {}).items():
+            x, y = (slot % columns) * self.size, (slot // columns) * self.size
+            self.icons[path] = (mtime, atlas.crop((x, y, x + self.size, y + self.size)))
+
+    def get(self, path):
+        """キャッシュ済みのアイコン（古い可能性あり）を返す。無ければ None"""
+        with self.lock:
+            cached = self.icons.get(path)
+        return cached[1] if cached else None
+
+    def request(self, paths, on_ready):
+        """paths のアイコンを（必要なら取り出し直して）バックグラウンドで用意する"""
+        self._submit(list(paths), on_ready, False)
+
+    def warm(self, paths, on_ready):
+        """request() と同じだが、paths に含まれないキャッシュは捨てる（起動時に全パスで呼ぶ）"""
+        self._submit(list(paths), on_ready, True)
+
+    def _submit(self, paths, on_ready, prune):
+        self.jobs.put((paths, on_ready, prune))
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._run, daemon=True)
+            self.worker.start()
+
+    def _run(self):
+        if sys.platform == "win32":
+            ctypes.windll.ole32.CoInitialize(None) # SHGetFileInfo が .lnk を解決するのに必要
+        while True:
+            paths, on_ready, prune = self.jobs.get()
+            for path in paths:
+                # 1件の失敗（壊れたアイコンや、閉じた後のウィンドウへの on_ready など）でワーカーを止めない
+                try:
+                    self._refresh(path, on_ready)
+                except Exception as e:
+                    print(f"アイコンの処理に失敗: {path}: {e}")
+            if prune:
+                keep = set(paths)
+                with self.lock:
+                    for path in [p for p in self.icons if p not in keep]:
+                        del self.icons[path]
+                        self.dirty = True
+            if self.jobs.empty():
+                self.save()
+
+    def _refresh(self, path, on_ready):
+        mtime = _mtime(path)
+        with self.lock:
+            cached = self.icons.get(path)
+        if cached and cached[0] == mtime:
+            return
+        image = extract_icon(path, self.size)
+        with self.lock:
+            self.icons[path] = (mtime, image)
+            self.dirty = True
+        on_ready(path, image)
+
+    def save(self):
+        """変更があればアトラスを書き出す（一時ファイルに書いてから置き換える）"""
+        with self.save_lock: # 古い内容で新しい内容を上書きしないように1つずつ書く
+            self._save()
+
+    def _save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            items = list(self.icons.items())
+            self.dirty = False
+        rows = max(1, -(-len(items) // ATLAS_COLUMNS))
+        atlas = Image.new("RGBA", (ATLAS_COLUMNS * self.size, rows * self.size), (0, 0, 0, 0))
+        entries = {}
+        for slot, (path, (mtime, image)) in enumerate(items):
+            atlas.paste(image, ((slot % ATLAS_COLUMNS) * self.size, (slot // ATLAS_COLUMNS) * self.size))
+            entries[path] = [mtime, slot]
+        meta = PngImagePlugin.PngInfo()
+        meta.add_text("icons", json.dumps({"size": self.size, "columns": ATLAS_COLUMNS, "entries": entries}), zip=True)
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=f"{ATLAS_FILE}.", suffix=".tmp", dir=os.path.dirname(self.atlas_path))
+        except OSError as e:
+            print(f"アイコンキャッシュの保存に失敗: {e}")
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                atlas.save(f, format="PNG", pnginfo=meta)
+            os.replace(tmp_path, self.atlas_path)
+        except OSError as e:
+            print(f"アイコンキャッシュの保存に失敗: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
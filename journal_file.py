@@ -0,0 +1,35 @@
+"""
+1行1レコードで追記していくファイル（ジャーナル・履歴）の補助。
+kensakumado2.py と gemini_project/claunhm.py の両方から使う。標準ライブラリだけを使う。
+"""
+import os
+
+def trim_torn_tail(path, block_size=4096):
+    """
+    クラッシュで途中まで書かれた最後の行（改行で終わっていない行）を切り捨てる。
+    そのまま追記すると次のレコードが壊れた行の続きに書かれ、読み込み時に一緒に捨てられてしまうので、
+    最初の追記より前に呼ぶ。切り捨てたら True、ファイルが無いか改行で終わっていれば False を返す。
+    """
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return False
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return False
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return False
+        # 後ろからブロック単位で最後の改行を探す
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block_size)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return True
+            pos = start
+        f.truncate(0)
+        return True
@@ -1,9 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox, font
 import webbrowser
+import subprocess
+from urllib.parse import quote_plus
 import json
+import math
 import os
+import sys
 import threading
+import time
+import random
+import argparse
+import sqlite3
+import zlib
+from journal_file import trim_torn_tail
 import pystray
 from PIL import Image, ImageDraw
 import re
@@ -71,6 +81,595 @@ def ask_string_dark(parent, title, prompt, initialvalue=None, colors=None):
     return dialog.result
 
 CONFIG_FILE = "search_config.json"
+HISTORY_FILE = "search_history.tsv"
+LOCAL_REFRESH_MS = 60 * 1000 # ローカル検索の索引を差分更新する間隔
+
+def compile_engine_url(template):
+    """検索URLのテンプレートを {} の位置で分割しておく（検索のたびに正規表現で置き換えない）"""
+    return re.split(r'\{.*?\}', template)
+
+def build_search_url(parts, query):
+    return quote_plus(query).join(parts)
+
+def open_urls(urls, browser_command=None):
+    """
+    URLをまとめて開く。browser_command（設定ファイルの "browser_command"、例: ["C:/.../chrome.exe"]）があれば
+    1回の起動で全部渡す。無ければ既定のブラウザが引数でURLを受け取る形式なら1回で、そうでなければ1件ずつ開く。
+    """
+    if browser_command:
+        try:
+            subprocess.Popen(list(browser_command) + urls)
+            return
+        except OSError as e:
+            print(f"ブラウザの起動に失敗: {e}")
+    browser = webbrowser.get()
+    if len(urls) > 1 and type(browser) in (webbrowser.GenericBrowser, webbrowser.BackgroundBrowser):
+        try:
+            subprocess.Popen([browser.name] + [arg for arg in browser.args if arg != "%s"] + urls)
+            return
+        except OSError as e:
+            print(f"ブラウザの起動に失敗: {e}")
+    for url in urls:
+        browser.open(url, new=2 if len(urls) > 1 else 0)
+
+def open_local_file(path):
+    try:
+        if os.name == 'nt':
+            os.startfile(path)
+        else:
+            subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", path])
+    except OSError as e:
+        messagebox.showerror("エラー", f"ファイルを開けませんでした:\n{path}\n{e}")
+
+# --- 検索エンジン（プロバイダ） ---
+# search_engines の URL が "local:フォルダ" ならローカルの全文検索、それ以外は Web の検索URLテンプレート
+LOCAL_PREFIX = "local:"
+
+class WebSearchProvider:
+    """検索URLのテンプレートで Web 検索するエンジン"""
+    is_local = False
+
+    def __init__(self, template):
+        self.parts = compile_engine_url(template)
+
+    def url(self, query):
+        return build_search_url(self.parts, query)
+
+_index_locks = {}
+_index_locks_guard = threading.Lock()
+
+def _index_lock(db_path):
+    """同じ索引ファイルを更新する refresh を1つにするロック（タブを作り直してプロバイダが替わっても共有する）"""
+    with _index_locks_guard:
+        return _index_locks.setdefault(os.path.abspath(db_path), threading.Lock())
+
+def _bigrams(text):
+    """1〜2文字の語を引くための文字バイグラム列（"天気が" → "天気 気が が"）"""
+    return " ".join(text[i:i + 2] for i in range(len(text)))
+
+class LocalIndexProvider:
+    """
+    フォルダ内のテキストファイルを SQLite FTS5 に索引して、入力中に結果を出すエンジン。
+    refresh() は更新日時とサイズが変わったファイルだけを読み直す（別スレッドから呼ぶ。自前の接続を使う）。
+    search() はUIのスレッドから呼ぶ。索引は2つ持つ:
+      notes  trigram トークナイザ。3文字以上の語を日本語でも部分一致で引く
+      grams  ファイル名と本文を文字バイグラムにしたもの。2文字の語はバイグラムそのもの、1文字の語は前方一致で引く
+    """
+    is_local = True
+    EXTENSIONS = ('.txt', '.md', '.markdown', '.rst', '.org', '.csv', '.log', '.json', '.html', '.py')
+    MAX_FILE_SIZE = 2 * 1024 * 1024
+    INDEX_VERSION = 2 # 索引の形式を変えたら上げる（古い索引は作り直す）
+
+    def __init__(self, root, db_path):
+        self.root = root
+        self.db_path = db_path
+        self.conn = None # UIスレッド用
+        self.refresh_lock = _index_lock(db_path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL") # 索引の更新中も検索できるように
+        if conn.execute("PRAGMA user_version").fetchone()[0] != self.INDEX_VERSION:
+            # 形式の違う索引は捨てる（次の refresh で全ファイルを読み直す）
+            conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS notes; DROP TABLE IF EXISTS grams;")
+            conn.execute(f"PRAGMA user_version={self.INDEX_VERSION}")
+        conn.execute("CREATE TABLE IF NOT EXISTS files(id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime_ns INTEGER, size INTEGER)")
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS notes USING fts5(name, body, tokenize='trigram')")
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS grams USING fts5(name, body, tokenize='unicode61 remove_diacritics 0', prefix='1')")
+        return conn
+
+    @staticmethod
+    def _read_text(path):
+        try:
+            with open(path, "rb") as f: data = f.read()
+        except OSError as e:
+            print(f"ファイルの読み込みエラー: {path}: {e}")
+            return None
+        for encoding in ("utf-8-sig", "cp932"):
+            try: return data.decode(encoding)
+            except UnicodeDecodeError: pass
+        return data.decode("utf-8", errors="replace")
+
+    def _scan(self):
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if not filename.lower().endswith(self.EXTENSIONS): continue
+                path = os.path.join(dirpath, filename)
+                try: st = os.stat(path)
+                except OSError: continue
+                if st.st_size <= self.MAX_FILE_SIZE:
+                    found[path] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def refresh(self):
+        """変わったファイルだけ索引し直す。(更新件数, 削除件数) を返す。別の refresh が実行中なら None"""
+        if not self.refresh_lock.acquire(blocking=False): return None
+        try:
+            if not os.path.isdir(self.root):
+                print(f"ローカル検索のフォルダがありません: {self.root}")
+                return None
+            found = self._scan()
+            conn = self._connect()
+            try:
+                known = {path: (file_id, (mtime_ns, size)) for file_id, path, mtime_ns, size
+                         in conn.execute("SELECT id, path, mtime_ns, size FROM files")}
+                changed = [path for path, stat in found.items() if path not in known or known[path][1] != stat]
+                removed = [file_id for path, (file_id, _) in known.items() if path not in found]
+                with conn:
+                    for file_id in removed:
+                        conn.execute("DELETE FROM notes WHERE rowid=?", (file_id,))
+                        conn.execute("DELETE FROM grams WHERE rowid=?", (file_id,))
+                        conn.execute("DELETE FROM files WHERE id=?", (file_id,))
+                    for path in changed:
+                        text = self._read_text(path)
+                        if text is None: continue
+                        mtime_ns, size = found[path]
+                        if path in known:
+                            file_id = known[path][0]
+                            conn.execute("UPDATE files SET mtime_ns=?, size=? WHERE id=?", (mtime_ns, size, file_id))
+                            conn.execute("DELETE FROM notes WHERE rowid=?", (file_id,))
+                            conn.execute("DELETE FROM grams WHERE rowid=?", (file_id,))
+                        else:
+                            file_id = conn.execute("INSERT INTO files(path, mtime_ns, size) VALUES (?,?,?)", (path, mtime_ns, size)).lastrowid
+                        name = os.path.basename(path)
+                        conn.execute("INSERT INTO notes(rowid, name, body) VALUES (?,?,?)", (file_id, name, text))
+                        conn.execute("INSERT INTO grams(rowid, name, body) VALUES (?,?,?)", (file_id, _bigrams(name), _bigrams(text)))
+                return len(changed), len(removed)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"ローカル検索の索引エラー: {e}")
+            return None
+        finally:
+            self.refresh_lock.release()
+
+    def search(self, query, limit=20):
+        """[(パス, 抜粋)] を関連度順に返す"""
+        terms = query.split()
+        if not terms: return []
+        long_terms = [t for t in terms if len(t) >= 3]
+        short_terms = [t for t in terms if len(t) < 3]
+        gram_match = " ".join('"' + t.replace('"', '""') + '"' + ("*" if len(t) == 1 else "") for t in short_terms)
+        try:
+            if self.conn is None:
+                self.conn = self._connect()
+            if long_terms:
+                sql = ("SELECT files.path, snippet(notes, 1, '[', ']', '…', 32) FROM notes JOIN files ON files.id = notes.rowid"
+                       " WHERE notes MATCH ?")
+                params = [" ".join('"' + t.replace('"', '""') + '"' for t in long_terms)]
+                if short_terms:
+                    sql += " AND notes.rowid IN (SELECT rowid FROM grams WHERE grams MATCH ?)"
+                    params.append(gram_match)
+                return self.conn.execute(sql + " ORDER BY rank LIMIT ?", params + [limit]).fetchall()
+            # 短い語だけのときはバイグラムの索引で引き、抜粋は最初の語が出てくる位置の前後にする
+            sql = ("SELECT files.path, substr(notes.body, max(1, instr(notes.body, ?) - 12), 40)"
+                   " FROM (SELECT rowid, rank FROM grams WHERE grams MATCH ? ORDER BY rank LIMIT ?) AS hit"
+                   " JOIN files ON files.id = hit.rowid JOIN notes ON notes.rowid = hit.rowid ORDER BY hit.rank")
+            return self.conn.execute(sql, (short_terms[0], gram_match, limit)).fetchall()
+        except sqlite3.Error as e:
+            print(f"ローカル検索エラー: {e}")
+            return []
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+def make_provider(template):
+    if template.startswith(LOCAL_PREFIX):
+        root = os.path.abspath(os.path.expanduser(template[len(LOCAL_PREFIX):].strip()))
+        return LocalIndexProvider(root, f"local_index_{zlib.crc32(root.encode('utf-8')):08x}.sqlite3")
+    return WebSearchProvider(template)
+
+def bench_local(count):
+    """count 件のノートを一時フォルダに作って、索引の作成・差分更新と検索の時間を測る"""
+    import tempfile
+    random.seed(0)
+    words = ["".join(random.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(random.randint(3, 9))) for _ in range(5000)]
+    words += ["天気", "会議", "議事録", "買い物", "設計メモ", "検索", "ランチャー", "ショートカット"]
+    with tempfile.TemporaryDirectory() as tmp:
+        notes_dir = os.path.join(tmp, "notes")
+        os.makedirs(notes_dir)
+        for i in range(count):
+            with open(os.path.join(notes_dir, f"note{i:05}.md"), "w", encoding="utf-8") as f:
+                f.write(" ".join(random.choice(words) for _ in range(random.randint(100, 600))))
+        provider = LocalIndexProvider(notes_dir, os.path.join(tmp, "index.sqlite3"))
+        start = time.perf_counter()
+        provider.refresh()
+        print(f"{count} 件: 索引の作成 {time.perf_counter() - start:.2f} 秒")
+
+        time.sleep(0.01)
+        for i in range(0, count, max(1, count // 10)):
+            with open(os.path.join(notes_dir, f"note{i:05}.md"), "a", encoding="utf-8") as f:
+                f.write(" 追記")
+        start = time.perf_counter()
+        changed, removed = provider.refresh()
+        print(f"  差分更新 ({changed} 件): {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+        queries = [random.choice(words)[:n] for _ in range(100) for n in (1, 2, 3, 5, 9)]
+        queries += [f"{random.choice(words)} {random.choice(words)}" for _ in range(100)] + ["議事録", "天気", "天気 会議", "設計", "会 ab"]
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            provider.search(query)
+            timings.append((time.perf_counter() - start, query))
+        timings.sort()
+        print(f"  検索: 中央値 {timings[len(timings) // 2][0] * 1e3:.2f} ms, 最大 {timings[-1][0] * 1e3:.2f} ms ({timings[-1][1]!r})")
+        provider.conn.close()
+
+def key_name(key):
+    """pynputのキーオブジェクトを正規化された文字列に変換する"""
+    if isinstance(key, pk.Key):
+        return key.name
+    elif hasattr(key, 'char') and key.char:
+        if key.char == ' ': return 'space'
+        return key.char.lower()
+    return None
+
+# pynput のキー名 → Windows の仮想キーコード（英数字は文字コードそのまま）
+_VIRTUAL_KEYS = {
+    'ctrl': 0x11, 'ctrl_l': 0xA2, 'ctrl_r': 0xA3, 'shift': 0x10, 'shift_l': 0xA0, 'shift_r': 0xA1,
+    'alt': 0x12, 'alt_l': 0xA4, 'alt_r': 0xA5, 'alt_gr': 0xA5, 'cmd': 0x5B, 'cmd_l': 0x5B, 'cmd_r': 0x5C,
+    'space': 0x20, 'tab': 0x09, 'enter': 0x0D, 'esc': 0x1B, 'backspace': 0x08, 'delete': 0x2E, 'insert': 0x2D,
+    'home': 0x24, 'end': 0x23, 'page_up': 0x21, 'page_down': 0x22, 'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    **{f'f{i}': 0x6F + i for i in range(1, 25)},
+}
+
+def windows_key_down(name):
+    """Windows でそのキーが今押されているかを返す（対応の分からないキーは None）"""
+    vk = _VIRTUAL_KEYS.get(name)
+    if vk is None and len(name) == 1 and name.isascii() and name.isalnum():
+        vk = ord(name.upper())
+    if vk is None:
+        return None
+    return bool(ctypes.windll.user32.GetAsyncKeyState(vk) & 0x8000)
+
+class HotkeyMatcher:
+    """
+    グローバルホットキーの判定。押下中のキーを整数のビットマスクで持ち、1イベントあたり O(1) で判定する。
+    - キーオブジェクト → ビット の対応はキャッシュし、名前の正規化は初めて見たキーだけ行う
+    - 押しっぱなしのキーリピートでは発火しない（組み合わせのどれかを一度離すまで再発火しない）
+    - 離したイベントの取りこぼし対策:
+      is_down（キー名 → 今押されているか）があれば、キーが押されるたびに押下中とみなしている他のキーを
+      実際の状態と照らし合わせて、離されていたものを外す（何も押下中でなければ照会しない）。
+      無ければ、STALE_SECONDS の間キー入力が無いときだけ押下状態を捨てる。
+      フォーカスの移動など、取りこぼしやすい時は呼び出し側で reset() する。
+    on_match はリスナーのスレッドから呼ばれる。
+    """
+    STALE_SECONDS = 2.0
+
+    def __init__(self, combination, on_match, clock=time.monotonic, is_down=None):
+        self.on_match = on_match
+        self.clock = clock
+        self.is_down = is_down
+        self.set_combination(combination)
+
+    def set_combination(self, combination):
+        self.bits = {name: 1 << i for i, name in enumerate(sorted(combination))}
+        self.names = {bit: name for name, bit in self.bits.items()}
+        self.target = (1 << len(self.bits)) - 1
+        self.key_bits = {} # キーオブジェクト -> ビット（組み合わせに無いキーは 0）
+        self.reset()
+
+    def reset(self):
+        self.state = 0
+        self.latched = False
+        self.last_event = self.clock()
+
+    def _bit(self, key):
+        # 文字キー(KeyCode)は __hash__ が repr を使っていて遅いので、文字そのものをキャッシュのキーにする
+        cache_key = key.char if type(key) is pk.KeyCode and key.char else key
+        bit = self.key_bits.get(cache_key)
+        if bit is None:
+            bit = self.key_bits[cache_key] = self.bits.get(key_name(key), 0)
+        return bit
+
+    def on_press(self, key):
+        now = self.clock()
+        if now - self.last_event > self.STALE_SECONDS:
+            self.state = 0
+            self.latched = False
+        self.last_event = now
+        bit = self._bit(key)
+        if self.state & ~bit and self.is_down is not None:
+            self._drop_released(self.state & ~bit)
+        if not bit: return
+        self.state |= bit
+        if self.state == self.target and not self.latched:
+            self.latched = True
+            self.on_match()
+
+    def _drop_released(self, held):
+        # 押下中とみなしているキーのうち、実際には離されているものを外す
+        while held:
+            bit = held & -held
+            held ^= bit
+            if self.is_down(self.names[bit]) is False:
+                self.state &= ~bit
+                self.latched = False
+
+    def on_release(self, key):
+        self.last_event = self.clock()
+        bit = self._bit(key)
+        if bit:
+            self.state &= ~bit
+            self.latched = False
+
+def bench_hotkey(count):
+    """ホットキー判定の1イベントあたりの処理時間を、記録したような入力列を再生して測る"""
+    random.seed(0)
+    letters = [pk.KeyCode.from_char(c) for c in "abcdefghijklmnopqrstuvwxyz ,.-"]
+    events = []
+    while len(events) < count:
+        if random.random() < 0.02:
+            # ホットキー (ctrl_l + alt_l + space)、space はキーリピートで数回押下される
+            events += [(True, pk.Key.ctrl_l), (True, pk.Key.alt_l)] + [(True, pk.KeyCode.from_char(' '))] * 3
+            events += [(False, pk.KeyCode.from_char(' ')), (False, pk.Key.alt_l), (False, pk.Key.ctrl_l)]
+        else:
+            key = random.choice(letters)
+            events += [(True, key), (False, key)]
+    events = events[:count]
+
+    matches = []
+    matcher = HotkeyMatcher({'ctrl_l', 'alt_l', 'space'}, lambda: matches.append(1))
+    start = time.perf_counter()
+    for pressed, key in events:
+        if pressed: matcher.on_press(key)
+        else: matcher.on_release(key)
+    elapsed = time.perf_counter() - start
+
+    # 比較用: 以前の方式（毎回名前を正規化して集合の issubset で判定）
+    combination, pressed_keys = {'ctrl_l', 'alt_l', 'space'}, set()
+    start = time.perf_counter()
+    for pressed, key in events:
+        name = key_name(key)
+        if pressed:
+            if name: pressed_keys.add(name)
+            combination.issubset(pressed_keys)
+        elif name:
+            pressed_keys.discard(name)
+    old_elapsed = time.perf_counter() - start
+
+    print(f"{len(events)} イベント, 発火 {len(matches)} 回")
+    print(f"  ビットマスク判定: {elapsed / len(events) * 1e6:.2f} µs/イベント")
+    print(f"  以前の方式:       {old_elapsed / len(events) * 1e6:.2f} µs/イベント")
+
+class _TrieNode:
+    __slots__ = ("children", "top", "bucket")
+
+    def __init__(self):
+        self.children = None  # 文字 -> _TrieNode。葉のあいだは None
+        self.top = []         # この接頭辞で始まる上位 TOP_K 件の (スコア, キー)。スコアの高い順
+        self.bucket = set()   # 葉だけが持つ: この接頭辞で始まる全キー
+
+class QueryHistory:
+    """
+    検索履歴と接頭辞補完。履歴ファイルは1行1件の追記形式:
+      A <TAB> 時刻 <TAB> 検索語     検索した
+      S <TAB> スコア <TAB> 検索語   圧縮済みのスコア
+    スコアは log2(半減期 HALF_LIFE で減衰させた回数) + 時刻/HALF_LIFE。時間が経っても大小関係が変わらず、
+    使うたびに増えるだけなので、トライ木の各節点に上位 TOP_K 件を持たせたまま差分で更新できる。
+    葉は BURST_AT 件までキーをまとめて持ち、超えたら次の1文字で子に分ける（共通の接頭辞が長くても節点が増えすぎない）。
+    補完は接頭辞の長さ分たどるか、途中で葉に着いたらその葉のキー（BURST_AT 件以下）から絞り込むだけで済む。
+    """
+    HALF_LIFE = 7 * 24 * 3600 # 1週間で重みが半分になる
+    TOP_K = 9 # 入力そのものを候補から除いても8件返せるよう1件多く持つ
+    BURST_AT = 64
+    COMPACT_AFTER = 5000 # A 行がこれだけ溜まったら S 行だけに書き直す
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.scores = {}   # キー(小文字) -> スコア
+        self.display = {}  # キー -> 最後に入力された表記
+        self.root = _TrieNode()
+        self.loaded = False
+        self.pending = []  # 読み込みが終わる前に検索した (時刻, 検索語)
+        self.raw_lines = 0
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.split())
+
+    def load(self):
+        """履歴ファイルを読んでトライ木を作る。時間がかかるので別スレッドから呼ぶ"""
+        # 追記の途中で落ちた行を切り捨てる（次の追記がその行の続きになって一緒に読み飛ばされないように）。
+        # 読み込みが終わるまでは追記しない（add は pending に溜める）ので、ここで1回行えばよい
+        try:
+            trim_torn_tail(self.path)
+        except OSError as e:
+            print(f"検索履歴の修復エラー: {e}")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        kind, value, query = line.rstrip("\n").split("\t", 2)
+                        key = query.lower()
+                        if kind == "A":
+                            self._bump(key, float(value))
+                            self.raw_lines += 1
+                        elif kind == "S":
+                            self.scores[key] = float(value)
+                        else:
+                            continue
+                        self.display[key] = query
+                    except ValueError:
+                        pass # 形式の合わない行は読み飛ばす
+        except OSError as e:
+            if os.path.exists(self.path):
+                print(f"検索履歴の読み込みエラー: {e}")
+        # スコアの高い順に入れると、各節点の上位リストは先着 TOP_K 件で埋まって入れ替えが起きない
+        for key, score in sorted(self.scores.items(), key=lambda item: item[1], reverse=True):
+            self._index(key, score)
+        with self.lock:
+            self.loaded = True
+            pending, self.pending = self.pending, []
+            for now, query in pending:
+                self._record(query, now)
+
+    def add(self, query, now=None):
+        """検索した語を記録する（ファイルへの追記とトライ木の更新）"""
+        query = self.normalize(query)
+        if not query: return
+        now = time.time() if now is None else now
+        with self.lock:
+            if not self.loaded:
+                self.pending.append((now, query)) # 読み込み後にまとめて記録する
+                return
+            self._record(query, now)
+
+    def _record(self, query, now):
+        key = query.lower()
+        self.display[key] = query
+        self._index(key, self._bump(key, now))
+        self.raw_lines += 1
+        if self.raw_lines >= self.COMPACT_AFTER:
+            self._compact()
+        else:
+            self._append(f"A\t{now:.0f}\t{query}\n")
+
+    def _bump(self, key, now):
+        base = now / self.HALF_LIFE
+        old = self.scores.get(key)
+        score = base if old is None else math.log2(2 ** (old - base) + 1) + base
+        self.scores[key] = score
+        return score
+
+    def _index(self, key, score):
+        node, depth = self.root, 0
+        while True:
+            self._update_top(node, key, score)
+            if node.children is None:
+                node.bucket.add(key)
+                if len(node.bucket) > self.BURST_AT:
+                    self._burst(node, depth)
+                return
+            if depth == len(key):
+                return
+            child = node.children.get(key[depth])
+            if child is None:
+                child = node.children[key[depth]] = _TrieNode()
+            node, depth = child, depth + 1
+
+    def _burst(self, node, depth):
+        # ちょうど depth 文字のキーは子に入れない（その補完はここまでの節点の上位リストで足りる）
+        children = {}
+        for key in node.bucket:
+            if len(key) > depth:
+                child = children.get(key[depth])
+                if child is None:
+                    child = children[key[depth]] = _TrieNode()
+                child.bucket.add(key)
+        node.children, node.bucket = children, None
+        for child in children.values():
+            child.top = sorted(((self.scores[k], k) for k in child.bucket), reverse=True)[:self.TOP_K]
+            if len(child.bucket) > self.BURST_AT:
+                self._burst(child, depth + 1)
+
+    def _update_top(self, node, key, score):
+        top = node.top
+        # スコアは増えるだけなので、最下位以下なら（既にリストにある場合も含めて）何もしなくてよい
+        if len(top) >= self.TOP_K and score <= top[-1][0]:
+            return
+        for i, (_, k) in enumerate(top):
+            if k == key:
+                del top[i]
+                break
+        i = 0
+        while i < len(top) and top[i][0] >= score: i += 1
+        top.insert(i, (score, key))
+        del top[self.TOP_K:]
+
+    def complete(self, prefix, limit=TOP_K - 1):
+        """prefix で始まる過去の検索語を、よく・最近使った順に返す（入力と同じ語は除く）"""
+        typed = prefix
+        prefix = self.normalize(typed).lower()
+        if not prefix or not self.loaded: return []
+        if typed[-1].isspace():
+            prefix += " " # 「python 」なら次の単語の候補だけを出す
+        node = self.root
+        for ch in prefix:
+            if node.children is None:
+                keys = sorted((k for k in node.bucket if k.startswith(prefix)), key=self.scores.__getitem__, reverse=True)
+                return [self.display[k] for k in keys if k != prefix][:limit]
+            node = node.children.get(ch)
+            if node is None: return []
+        return [self.display[k] for _, k in node.top if k != prefix][:limit]
+
+    def _append(self, line):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"検索履歴の保存エラー: {e}")
+
+    def _compact(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, score in self.scores.items():
+                    f.write(f"S\t{score!r}\t{self.display[key]}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.raw_lines = 0
+        except OSError as e:
+            print(f"検索履歴の圧縮エラー: {e}")
+
+def bench_history(count):
+    """count 件の検索履歴を作って、読み込みと補完の時間を測る（履歴は一時ファイルに書く）"""
+    import tempfile
+    random.seed(0)
+    words = ["".join(random.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(random.randint(3, 9))) for _ in range(3000)]
+    heads = ["python", "tkinter", "how to", "amazon", "天気", "翻訳", "git", "error"]
+    start_time = time.time() - count * 60
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, HISTORY_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(count):
+                query = " ".join([random.choice(heads)] + random.sample(words, random.randint(1, 3)))
+                f.write(f"A\t{start_time + i * 60:.0f}\t{query}\n")
+
+        history = QueryHistory(path)
+        start = time.perf_counter()
+        history.load()
+        print(f"{count} 件 (重複除いて {len(history.scores)} 件): 読み込み {time.perf_counter() - start:.2f} 秒")
+
+        prefixes = [query[:n] for query in random.sample(list(history.display.values()), 200) for n in (1, 3, 6, 10, 14)]
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            history.complete(prefix)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"  補完: 中央値 {timings[len(timings) // 2] * 1e3:.3f} ms, 最大 {timings[-1] * 1e3:.3f} ms")
+
+        start = time.perf_counter()
+        for i in range(1000):
+            history.add(f"python bench {i % 50}")
+        print(f"  追加: {(time.perf_counter() - start):.3f} ms/件")
 
 class TraySearchApp(tk.Tk):
     def __init__(self):
@@ -104,7 +703,7 @@ class TraySearchApp(tk.Tk):
         self.configure(background=self.colors['bg']) # メインウィンドウの背景色
 
         self.title("単語ボタン検索アプリ")
-        self.geometry("700x280") # 高さを少し広げる
+        self.geometry("700x310") # 高さを少し広げる
         self.protocol("WM_DELETE_WINDOW", self._hide_window)
 
         # --- 設定ロード ---
@@ -118,6 +717,7 @@ class TraySearchApp(tk.Tk):
         self.hotkey_combination = set(self.config_data.get('hotkey', ['ctrl_l','alt_l','space']))
         self.focus_delay = self.config_data.get('focus_delay', 500) # Default to 500ms
         self.minimize_after_search = self.config_data.get('minimize_after_search', False)
+        self.fanout_engines = self.config_data.get('fanout_engines', list(self.search_engines))
 
         # --- タブ ---
         self.tab_control = ttk.Notebook(self)
@@ -132,10 +732,24 @@ class TraySearchApp(tk.Tk):
         self.main_entry = ttk.Entry(search_frame, width=60, font=entry_font)
         self.main_entry.pack(side="left", expand=True, fill="x")
         self.main_entry.bind("<Return>", self._search_on_enter)
+        self.main_entry.bind("<Shift-Return>", lambda e: self._search(fanout=True))
         self.main_entry.bind("<Button-3>", self._show_context_menu)
+        self.main_entry.bind("<KeyRelease>", self._update_suggestions)
+        self.main_entry.bind("<Down>", lambda e: self._move_suggestion(1))
+        self.main_entry.bind("<Up>", lambda e: self._move_suggestion(-1))
+        self.main_entry.bind("<Tab>", self._accept_suggestion)
+        self.main_entry.bind("<Escape>", lambda e: self._hide_suggestions())
+        self.main_entry.bind("<FocusOut>", lambda e: self.after(150, self._hide_suggestions_unless_focused))
+        self.tab_control.bind("<<NotebookTabChanged>>", lambda e: self._update_local_results())
         ttk.Button(search_frame, text="検索", command=self._search).pack(side="left", padx=(5,0))
+        ttk.Button(search_frame, text="一括検索", command=lambda: self._search(fanout=True)).pack(side="left", padx=(5,0))
         ttk.Button(search_frame, text="⚙", width=3, command=self._open_settings_window).pack(side="left", padx=(5,0))
 
+        # --- 一括検索（Shift+Enter）で開く検索エンジン ---
+        self.fanout_frame = ttk.Frame(self)
+        self.fanout_frame.pack(fill=tk.X, padx=10)
+        self._refresh_fanout_checks()
+
         # --- 単語ボタンフレーム ---
         self.words_frame = ttk.Frame(self)
         self.words_frame.pack(pady=5, padx=10, fill=tk.X)
@@ -144,6 +758,23 @@ class TraySearchApp(tk.Tk):
         button_frame.pack(pady=(5,10))
         ttk.Button(button_frame,text="単語追加",command=self._add_word).pack(side="left", padx=5)
 
+        # --- 検索履歴の補完候補（検索窓の下に出すポップアップ） ---
+        self.history = QueryHistory(HISTORY_FILE)
+        threading.Thread(target=self.history.load, daemon=True).start()
+        self.suggest_popup = tk.Toplevel(self)
+        self.suggest_popup.overrideredirect(True)
+        self.suggest_popup.withdraw()
+        self.suggest_list = tk.Listbox(self.suggest_popup, font=entry_font, activestyle="none", borderwidth=1, relief="solid",
+                                       bg=self.colors['entry_bg'], fg=self.colors['entry_fg'],
+                                       selectbackground=self.colors['tab_selected_bg'], selectforeground=self.colors['tab_selected_fg'])
+        self.suggest_list.pack(fill=tk.BOTH, expand=True)
+        self.suggest_list.bind("<ButtonRelease-1>", self._accept_suggestion)
+
+        # --- ローカル検索の索引は定期的に差分更新する ---
+        self.after(LOCAL_REFRESH_MS, self._schedule_local_refresh)
+        if any(provider.is_local for provider in self.providers.values()):
+            self.geometry("700x420") # 検索結果欄のぶん高くする
+
         # --- トレイ ---
         self.icon = pystray.Icon("TraySearch", self._create_tray_image(), "検索アプリ")
         menu = pystray.Menu(
@@ -154,7 +785,11 @@ class TraySearchApp(tk.Tk):
         threading.Thread(target=self.icon.run, daemon=True).start()
 
         # --- IME対応ホットキー ---
-        self.pressed_keys = set()
+        self.hotkey_matcher = HotkeyMatcher(self.hotkey_combination, lambda: self.after(0, self._toggle_window),
+                                            is_down=windows_key_down if os.name == 'nt' else None)
+        # フォーカスが移る間のキーの離しは取りこぼしやすいので、押下状態を捨てる
+        self.bind("<FocusIn>", lambda e: self.hotkey_matcher.reset(), add="+")
+        self.bind("<FocusOut>", lambda e: self.hotkey_matcher.reset(), add="+")
         self.is_setting_hotkey = False
         self.listener = pk.Listener(on_press=self._on_press, on_release=self._on_release)
         self.listener.start()
@@ -165,27 +800,15 @@ class TraySearchApp(tk.Tk):
     # キーイベント処理
     # -----------------------------
     def _get_key_name(self, key):
-        """pynputのキーオブジェクトを正規化された文字列に変換する"""
-        if isinstance(key, pk.Key):
-            return key.name
-        elif hasattr(key, 'char') and key.char:
-            if key.char == ' ': return 'space'
-            return key.char.lower()
-        return None
+        return key_name(key)
 
     def _on_press(self, key):
         if self.is_setting_hotkey: return # ホットキー設定中はメインの動作を止める
-        key_name = self._get_key_name(key)
-        if key_name:
-            self.pressed_keys.add(key_name)
-        if self.hotkey_combination.issubset(self.pressed_keys):
-            self._toggle_window()
+        self.hotkey_matcher.on_press(key)
 
     def _on_release(self, key):
         if self.is_setting_hotkey: return
-        key_name = self._get_key_name(key)
-        if key_name:
-            self.pressed_keys.discard(key_name)
+        self.hotkey_matcher.on_release(key)
 
     # -----------------------------
     # 単語ボタン操作
@@ -222,19 +845,75 @@ class TraySearchApp(tk.Tk):
     def _refresh_search_tabs(self):
         for t in self.tab_control.tabs(): self.tab_control.forget(t)
         self.tabs.clear()
-        for name in self.search_engines.keys():
+        for provider in getattr(self, 'providers', {}).values():
+            if provider.is_local: provider.close()
+        self.providers = {}
+        self.result_lists = {}
+        self.local_results = []
+        for name, url in self.search_engines.items():
             frame = ttk.Frame(self.tab_control)
             self.tab_control.add(frame,text=name)
             self.tabs[name]=frame
+            self.providers[name] = make_provider(url)
+            if self.providers[name].is_local:
+                # ローカル検索のタブには入力中の検索結果を出す
+                results = tk.Listbox(frame, height=6, activestyle="none", borderwidth=0,
+                                     bg=self.colors['entry_bg'], fg=self.colors['entry_fg'],
+                                     selectbackground=self.colors['tab_selected_bg'], selectforeground=self.colors['tab_selected_fg'])
+                results.pack(fill=tk.BOTH, expand=True)
+                results.bind("<Double-Button-1>", lambda e: self._open_local_result())
+                results.bind("<Return>", lambda e: self._open_local_result())
+                self.result_lists[name] = results
+        self._start_local_refresh()
+        if hasattr(self, 'fanout_frame'):
+            self._refresh_fanout_checks()
+
+    def _current_engine(self):
+        """選択中のタブの (名前, プロバイダ)。タブが無ければ (None, None)"""
+        if not self.tab_control.tabs(): return None, None
+        name = self.tab_control.tab(self.tab_control.select(), "text")
+        return name, self.providers.get(name)
+
+    def _refresh_fanout_checks(self):
+        for w in self.fanout_frame.winfo_children(): w.destroy()
+        ttk.Label(self.fanout_frame, text="一括検索:").pack(side="left")
+        self.fanout_vars = {}
+        for name in self.search_engines:
+            if self.providers[name].is_local: continue # 一括検索はブラウザで開く Web の検索エンジンだけ
+            var = tk.BooleanVar(value=name in self.fanout_engines)
+            ttk.Checkbutton(self.fanout_frame, text=name, variable=var, command=self._toggle_fanout_engine).pack(side="left", padx=(5,0))
+            self.fanout_vars[name] = var
+
+    def _toggle_fanout_engine(self):
+        self.fanout_engines = [name for name, var in self.fanout_vars.items() if var.get()]
+        self._save_config()
+
+    def _open_urls_in_background(self, urls):
+        """ブラウザの起動を待つとUIが固まるので別スレッドで開く。失敗したらUIのスレッドで知らせる"""
+        def run():
+            try:
+                open_urls(urls, self.config_data.get('browser_command'))
+            except (webbrowser.Error, OSError) as e:
+                print(f"ブラウザを開けませんでした: {e}")
+                self.after(0, lambda e=e: messagebox.showerror("エラー", f"ブラウザを開けませんでした:\n{e}"))
+        threading.Thread(target=run, daemon=True).start()
 
     def _search_on_enter(self,event=None): self._search()
-    def _search(self):
-        selected_tab = self.tab_control.tab(self.tab_control.select(),"text")
-        engine_url = self.search_engines.get(selected_tab)
+    def _search(self, fanout=False):
+        if fanout:
+            names = self.fanout_engines
+        else:
+            name, provider = self._current_engine()
+            if provider is not None and provider.is_local:
+                self._open_local_result()
+                return
+            names = [name]
         query = self.main_entry.get().strip()
-        if query and engine_url:
-            url = re.sub(r'\{.*?\}', query.replace(" ","+"), engine_url)
-            webbrowser.open(url)
+        self._hide_suggestions()
+        urls = [self.providers[name].url(query) for name in names if name in self.providers and not self.providers[name].is_local]
+        if query and urls:
+            self.history.add(query)
+            self._open_urls_in_background(urls)
             
             # 設定に応じて動作を変更
             if self.minimize_after_search:
@@ -243,6 +922,119 @@ class TraySearchApp(tk.Tk):
                 # ブラウザが開いた後にメインウィンドウとエントリーにフォーカスを戻す
                 self.after(self.focus_delay, self._show_window) # _show_windowがフォーカス処理を含む
 
+    # -----------------------------
+    # ローカル検索
+    # -----------------------------
+    def _start_local_refresh(self):
+        """ローカル検索の索引を別スレッドで差分更新する（実行中のものがあればそのプロバイダは飛ばされる）"""
+        for provider in self.providers.values():
+            if provider.is_local:
+                threading.Thread(target=self._refresh_local_index, args=(provider,), daemon=True).start()
+
+    def _refresh_local_index(self, provider):
+        result = provider.refresh()
+        if result and any(result):
+            self.after(0, self._update_local_results) # 表示中の結果を新しい索引で出し直す
+
+    def _schedule_local_refresh(self):
+        self._start_local_refresh()
+        self.after(LOCAL_REFRESH_MS, self._schedule_local_refresh)
+
+    def _update_local_results(self):
+        name, provider = self._current_engine()
+        if provider is None or not provider.is_local: return
+        results = self.result_lists[name]
+        query = self.main_entry.get().strip()
+        self.local_results = provider.search(query) if query else []
+        results.delete(0, tk.END)
+        for path, snippet in self.local_results:
+            results.insert(tk.END, f"{os.path.relpath(path, provider.root)}   {' '.join(snippet.split())}")
+        if self.local_results:
+            results.selection_set(0)
+
+    def _move_local_result(self, name, step):
+        results = self.result_lists[name]
+        size = results.size()
+        if not size: return "break"
+        current = results.curselection()
+        index = (current[0] + step) % size if current else 0
+        results.selection_clear(0, tk.END)
+        results.selection_set(index)
+        results.see(index)
+        return "break"
+
+    def _open_local_result(self):
+        name, provider = self._current_engine()
+        if provider is None or not provider.is_local or not self.local_results: return
+        current = self.result_lists[name].curselection()
+        path = self.local_results[current[0] if current else 0][0]
+        self.history.add(self.main_entry.get())
+        open_local_file(path)
+        if self.minimize_after_search:
+            self._hide_window()
+
+    # -----------------------------
+    # 検索履歴の補完
+    # -----------------------------
+    def _update_suggestions(self, event=None):
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        name, provider = self._current_engine()
+        if provider is not None and provider.is_local:
+            # ローカル検索のタブでは履歴の代わりに検索結果をその場で出す
+            self._hide_suggestions()
+            self._update_local_results()
+            return
+        suggestions = self.history.complete(self.main_entry.get())
+        if not suggestions:
+            self._hide_suggestions()
+            return
+        self.suggest_list.delete(0, tk.END)
+        for query in suggestions:
+            self.suggest_list.insert(tk.END, query)
+        self.suggest_list.configure(height=len(suggestions))
+        self.suggest_popup.geometry(f"{self.main_entry.winfo_width()}x{self.suggest_list.winfo_reqheight()}"
+                                    f"+{self.main_entry.winfo_rootx()}+{self.main_entry.winfo_rooty() + self.main_entry.winfo_height()}")
+        self.suggest_popup.deiconify()
+        self.suggest_popup.lift()
+
+    def _move_suggestion(self, step):
+        name, provider = self._current_engine()
+        if provider is not None and provider.is_local:
+            return self._move_local_result(name, step)
+        if not self.suggest_popup.winfo_viewable():
+            return
+        size = self.suggest_list.size()
+        current = self.suggest_list.curselection()
+        index = (current[0] + step) % size if current else (0 if step > 0 else size - 1)
+        self.suggest_list.selection_clear(0, tk.END)
+        self.suggest_list.selection_set(index)
+        self.suggest_list.see(index)
+        # 選んだ候補を検索窓に入れる（そのまま Enter で検索できる）
+        self.main_entry.delete(0, tk.END)
+        self.main_entry.insert(0, self.suggest_list.get(index))
+        return "break"
+
+    def _accept_suggestion(self, event=None):
+        if not self.suggest_popup.winfo_viewable():
+            return
+        current = self.suggest_list.curselection()
+        query = self.suggest_list.get(current[0] if current else 0)
+        self.main_entry.delete(0, tk.END)
+        self.main_entry.insert(0, query + " ")
+        self.main_entry.icursor(tk.END)
+        self.main_entry.focus_set()
+        self._hide_suggestions()
+        return "break"
+
+    def _hide_suggestions(self):
+        self.suggest_list.selection_clear(0, tk.END)
+        self.suggest_popup.withdraw()
+
+    def _hide_suggestions_unless_focused(self):
+        if self.focus_get() not in (self.main_entry, self.suggest_list):
+            self._hide_suggestions()
+
     def _show_context_menu(self, event):
         context_menu = tk.Menu(self, tearoff=0, bg=self.colors['bg'], fg=self.colors['fg'])
 
@@ -358,8 +1150,11 @@ class TraySearchApp(tk.Tk):
     # -----------------------------
     # ウィンドウ表示/非表示
     # -----------------------------
-    def _hide_window(self): self.withdraw()
+    def _hide_window(self):
+        self._hide_suggestions()
+        self.withdraw()
     def _show_window(self):
+        self._start_local_refresh() # 隠れている間に編集されたノートを拾う
         self.deiconify()
         self.state("normal")
         self.lift()
@@ -470,7 +1265,7 @@ class TraySearchApp(tk.Tk):
     def _add_search_engine(self):
         n = ask_string_dark(self.settings_window, "追加", "検索エンジン名:", colors=self.colors)
         if not n: return
-        u = ask_string_dark(self.settings_window, "追加", "URL (例: https://www.google.com/search?q={}):", colors=self.colors)
+        u = ask_string_dark(self.settings_window, "追加", "URL (例: https://www.google.com/search?q={} / ローカル検索は local:フォルダ):", colors=self.colors)
         if not u: return
         self.search_engines[n] = u
         self._save_config()
@@ -488,8 +1283,13 @@ class TraySearchApp(tk.Tk):
         if not u: return
         del self.search_engines[old_name]
         self.search_engines[n] = u
+        # 既にある名前に変えた場合は1つにまとめる（一括検索の対象も重複させない）
+        self.fanout_engines = list(dict.fromkeys(n if name == old_name else name for name in self.fanout_engines))
         self._save_config()
         self._refresh_search_tabs()
+        for row in self.se_tree.get_children():
+            if row != sel[0] and str(self.se_tree.item(row)['values'][0]) == n:
+                self.se_tree.delete(row)
         self.se_tree.item(sel[0],values=(n,u))
 
     def _delete_search_engine(self):
@@ -499,6 +1299,7 @@ class TraySearchApp(tk.Tk):
         name = item['values'][0]
         if messagebox.askyesno("確認",f"{name} を削除しますか？"):
             del self.search_engines[name]
+            self.fanout_engines = [n for n in self.fanout_engines if n != name]
             self._save_config()
             self._refresh_search_tabs()
             self.se_tree.delete(sel[0])
@@ -536,6 +1337,7 @@ class TraySearchApp(tk.Tk):
             non_modifier_keys = [k for k in new_hotkeys if not any(mod in k for mod in ['ctrl', 'alt', 'shift', 'cmd', 'win'])]
             if new_hotkeys and (non_modifier_keys or any(k in new_hotkeys for k in ['space', 'enter', 'tab'])):
                 self.hotkey_combination = new_hotkeys
+                self.hotkey_matcher.set_combination(new_hotkeys)
                 self._save_config()
                 self.hotkey_label_var.set(f"現在のホットキー: {' + '.join(sorted(list(self.hotkey_combination)))}")
                 if hotkey_listener: hotkey_listener.stop()
@@ -557,6 +1359,7 @@ class TraySearchApp(tk.Tk):
         
         setter_window.wait_window()
         self.is_setting_hotkey = False
+        self.hotkey_matcher.reset() # 設定中に押したキーを残さない
 
     def _save_focus_delay(self):
         try:
@@ -586,6 +1389,7 @@ class TraySearchApp(tk.Tk):
         self.config_data["hotkey"] = list(self.hotkey_combination)
         self.config_data["focus_delay"] = self.focus_delay
         self.config_data["minimize_after_search"] = self.minimize_after_search
+        self.config_data["fanout_engines"] = self.fanout_engines
         with open(CONFIG_FILE,"w",encoding="utf-8") as f: json.dump(self.config_data,f,ensure_ascii=False,indent=2)
 
     # -----------------------------
@@ -593,10 +1397,26 @@ class TraySearchApp(tk.Tk):
     # -----------------------------
     def _exit_app(self):
         self.icon.stop()
+        for provider in self.providers.values():
+            if provider.is_local: provider.close()
         if self.listener.is_alive():
             self.listener.stop()
         self.destroy()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="単語ボタン検索アプリ")
+    parser.add_argument("--bench-hotkey", type=int, metavar="N", help="N 件のキー入力を再生してホットキー判定の時間を測る")
+    parser.add_argument("--bench-history", type=int, metavar="N", help="N 件の検索履歴で補完の時間を測る")
+    parser.add_argument("--bench-local", type=int, metavar="N", help="N 件のノートでローカル検索の索引と検索の時間を測る")
+    args = parser.parse_args()
+    if args.bench_hotkey:
+        bench_hotkey(args.bench_hotkey)
+        sys.exit()
+    if args.bench_history:
+        bench_history(args.bench_history)
+        sys.exit()
+    if args.bench_local:
+        bench_local(args.bench_local)
+        sys.exit()
     app = TraySearchApp()
     app.mainloop()
\ No newline at end of file
@@ -6,66 +6,227 @@ import subprocess
 import time
 import json
 import os
+import sys
+import argparse
+import heapq
 import pystray
-from PIL import Image, ImageDraw
-import pylnk3
-import psutil
+from PIL import Image, ImageDraw, ImageTk
+from datetime import datetime
+from launcher_core import APP_JSON, FOLDER_PREFIX, LaunchScheduler, ResourceSampler, LauncherCore
+from launcher_control import ControlServer, CONTROL_PORT, CONTROL_TOKEN_FILE
+from icon_cache import IconCache, ICON_SIZE
 
-APP_JSON = "apps.json"
 APP_TITLE = "起動順＆一括タイマーランチャー"
-FOLDER_PREFIX = "folder:"
+RESOURCE_TAB_NAME = "リソース監視"
+FIXED_TABS = ("起動中一覧", RESOURCE_TAB_NAME) # 削除やタイマー設定ができない固定タブ
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+WEEKDAY_NAMES = "月火水木金土日"
+SAVE_DELAY_MS = 500 # 設定保存をまとめるための待ち時間
+
+
+def _sleep_clock():
+    """スリープ中も進み、時計合わせでは変わらない時計。無い環境では実時刻で代用する（時計合わせと区別できない）"""
+    if hasattr(time, "CLOCK_BOOTTIME"): # Linux
+        return lambda: time.clock_gettime(time.CLOCK_BOOTTIME)
+    if sys.platform == "darwin": # macOS の CLOCK_MONOTONIC はスリープ中も進む
+        return lambda: time.clock_gettime(time.CLOCK_MONOTONIC)
+    return time.time
+
+class TimerService:
+    """
+    複数のタブタイマーを1つのスケジューラ(after)で動かすクラス。
+    締め切りをヒープで管理し、表示する「分」が変わる時か締め切りの時だけ起きる。
+    残り時間は time.monotonic() の締め切りから計算する（時計合わせで実時刻が進んでも早く切れない）。
+    スリープで monotonic が止まる環境向けに、起きるたびにスリープ中も進む時計(sleep_clock)と比べ、
+    monotonic より大きく進んでいたらスリープ復帰とみなして、眠っていた分だけ締め切りを早める。
+    """
+    def __init__(self, widget, on_tick, on_expire, max_sleep=30.0):
+        self.widget = widget
+        self.on_tick = on_tick # (タイマー名, 残り分) 表示する分が変わった時
+        self.on_expire = on_expire # (タイマー名) 締め切りになった時
+        self.max_sleep = max_sleep
+        self.deadlines = {} # name -> monotonic の締め切り
+        self.displayed = {} # name -> 最後に表示した残り分
+        self.generations = {} # name -> start() ごとに変わる番号（古いヒープのエントリを見分ける）
+        self.next_generation = 0
+        self.heap = [] # (次に起きる monotonic 時刻, 番号, name)
+        self.after_id = None
+        self.sleep_clock = _sleep_clock()
+        self.last_clock = (time.monotonic(), self.sleep_clock())
+
+    def start(self, name, seconds):
+        self.deadlines[name] = time.monotonic() + seconds
+        self.displayed[name] = None
+        self.next_generation += 1
+        self.generations[name] = self.next_generation
+        heapq.heappush(self.heap, (time.monotonic(), self.next_generation, name))
+        self._reschedule()
+
+    def cancel(self, name):
+        self.deadlines.pop(name, None)
+        self.displayed.pop(name, None)
+        self.generations.pop(name, None)
+        # ヒープからは遅延削除（起きた時に無視する）
+
+    def _is_current(self, entry):
+        """キャンセル済みや、同じ名前で start() し直す前のエントリなら False"""
+        _, generation, name = entry
+        return self.generations.get(name) == generation
+
+    def remaining(self, name):
+        return max(0.0, self.deadlines[name] - time.monotonic())
+
+    def _next_wakeup(self, name):
+        """表示する分が次に変わる時刻（または締め切り）を monotonic で返す"""
+        remaining = self.remaining(name)
+        until_change = remaining % 60 or 60.0
+        return time.monotonic() + min(remaining, until_change) + 0.01
+
+    def _run(self):
+        self.after_id = None
+        now_mono, now_sleep = time.monotonic(), self.sleep_clock()
+
+        # スリープ中も進む時計だけが大きく進んでいたらスリープ復帰とみなし、眠っていた分を経過時間に足して確認し直す
+        last_mono, last_sleep = self.last_clock
+        slept = (now_sleep - last_sleep) - (now_mono - last_mono)
+        if slept > 2.0:
+            for name in self.deadlines:
+                self.deadlines[name] -= slept
+            self.heap = [(now_mono, self.generations[name], name) for name in self.deadlines]
+            heapq.heapify(self.heap)
+        self.last_clock = (now_mono, now_sleep)
+
+        while self.heap and self.heap[0][0] <= now_mono:
+            entry = heapq.heappop(self.heap)
+            if not self._is_current(entry):
+                continue
+            _, generation, name = entry
+            remaining = self.remaining(name)
+            if remaining <= 0:
+                self.cancel(name)
+                self.on_expire(name)
+                continue
+            mins = int(remaining // 60)
+            if self.displayed.get(name) != mins:
+                self.displayed[name] = mins
+                self.on_tick(name, mins)
+            heapq.heappush(self.heap, (self._next_wakeup(name), generation, name))
+
+        self._reschedule()
+
+    def _reschedule(self):
+        if self.after_id:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        # キャンセル済み・古いエントリは捨てる
+        while self.heap and not self._is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return
+        delay = min(max(0.0, self.heap[0][0] - time.monotonic()), self.max_sleep)
+        self.after_id = self.widget.after(int(delay * 1000), self._run)
 
 class AppLauncher(TkinterDnD.Tk):
-    def __init__(self):
+    def __init__(self, profile_startup=False):
+        startup_begin = time.perf_counter()
         super().__init__()
         self.title(APP_TITLE)
         self.geometry("700x500")
 
         # --- データ管理 ---
-        self.app_groups = {}
+        self.core = LauncherCore(APP_JSON)
         self.running_processes = {}
-        self.app_status = {}
-        self.tab_timers = {}
+        self.timer_service = TimerService(self, self._on_timer_tick, self._stop_timer)
         self.tab_running_flags = {}
         self.tab_tray_icons = {}
         self.status_tree = None
+        self.status_rows = {} # Treeviewの行ID -> 表示中の値
+        self.resource_tree = None
+        self.broken_apps = set()
+        self.icon_cache = IconCache(os.path.dirname(os.path.abspath(APP_JSON)))
+        self.icon_images = {} # アイコンのパス -> PhotoImage（参照を持っていないと表示が消える）
+        self.icon_buttons = {} # アイコンのパス -> そのアイコンを表示しているボタン
+        self.blank_icon = None
+        self.save_after_id = None
         self.tabs = {}
+        self.built_tabs = set() # 中身を作成済みのタブ（タブは初めて選択された時に作る）
         self.tab_control = None
 
         # --- 初期化 ---
+        load_begin = time.perf_counter()
         self._load_apps()
+        self.resource_sampler = ResourceSampler(self.core.process_tracker, self.core.resource_interval,
+                                                on_sample=lambda: self.after(0, self._update_resource_table))
+        ui_begin = time.perf_counter()
         self._setup_ui()
-        self._periodic_update()
+        ui_end = time.perf_counter()
+        self.core.start_tracker_polling(self._run_on_ui)
+        self.resource_sampler.start()
+        self.launch_scheduler = LaunchScheduler(
+            self.core.schedules, lambda tab, action: self.after(0, lambda: self._run_scheduled_action(tab, action)))
+        self.launch_scheduler.start()
+        self.control_server = ControlServer(
+            self._handle_control_command, os.path.join(os.path.dirname(os.path.abspath(APP_JSON)), CONTROL_TOKEN_FILE))
+        try:
+            self.control_server.start()
+        except OSError as e:
+            print(f"コマンド受付を開始できませんでした (ポート {CONTROL_PORT}): {e}")
+        threading.Thread(target=self._warm_lnk_cache, daemon=True).start()
+        self.icon_cache.warm({self._icon_source(app) for apps in self.core.app_groups.values() for app in apps},
+                             lambda path, image: self.after(0, lambda: self._apply_icon(path, image)))
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        if profile_startup:
+            timings = {
+                "Tk初期化": load_begin - startup_begin,
+                "設定読み込み": ui_begin - load_begin,
+                "UI構築": ui_end - ui_begin,
+            }
+            self.after_idle(lambda: self._report_startup_profile(startup_begin, timings))
+
+    def _report_startup_profile(self, startup_begin, timings):
+        """--profile-startup 指定時に、最初の表示までの時間を出力する"""
+        self.update_idletasks()
+        timings["初回表示まで（合計）"] = time.perf_counter() - startup_begin
+        print(f"起動時間プロファイル (タブ {len(self.tabs)} 個 / 作成済み {len(self.built_tabs)} 個, "
+              f"アプリ {sum(len(a) for a in self.core.app_groups.values())} 件)")
+        for label, seconds in timings.items():
+            print(f"  {label}: {seconds * 1000:.1f} ms")
 
     # -----------------------------
     # データ永続化
     # -----------------------------
     def _load_apps(self):
         try:
-            if os.path.exists(APP_JSON):
-                with open(APP_JSON, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.app_groups = data.get("app_groups", {})
-                    self.last_active_tab = data.get("last_active_tab")
-            else:
-                self.app_groups = {}
-                self.last_active_tab = None
+            self.core.load()
         except (json.JSONDecodeError, TypeError) as e:
             messagebox.showerror("エラー", f"設定ファイル({APP_JSON})の読み込みに失敗しました。\n{e}")
-            self.app_groups = {}
-            self.last_active_tab = None
 
     def _save_apps(self):
+        """変更を記録し、少し待ってからまとめて保存する（タブ切り替えが続いても1回の書き込みで済む）"""
+        if self.save_after_id is None:
+            self.save_after_id = self.after(SAVE_DELAY_MS, self._flush_apps)
+
+    def _flush_apps(self):
+        """保存待ちの設定をすぐに書き込む。内容が前回と同じなら書き込まない"""
+        if self.save_after_id is not None:
+            self.after_cancel(self.save_after_id)
+            self.save_after_id = None
         try:
-            data = {
-                "app_groups": self.app_groups,
-                "last_active_tab": self.last_active_tab
-            }
-            with open(APP_JSON, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.core.save()
         except Exception as e:
             messagebox.showerror("エラー", f"設定ファイル({APP_JSON})の保存に失敗しました。\n{e}")
 
+    def _on_close(self):
+        self._flush_apps()
+        self.control_server.stop()
+        self.core.lnk_cache.save()
+        self.icon_cache.save()
+        self.resource_sampler.stop()
+        self.core.stop_tracker_polling()
+        self.launch_scheduler.stop()
+        self.destroy()
+
     # -----------------------------
     # UI構築
     # -----------------------------
@@ -80,6 +241,9 @@ class AppLauncher(TkinterDnD.Tk):
         button_frame.grid_columnconfigure(2, weight=0) # タブ追加ボタンのカラムは固定
         button_frame.grid_columnconfigure(3, weight=0) # タブ削除ボタンのカラムは固定
 
+        btn_group_launch = tk.Button(button_frame, text="一括起動", command=self._launch_current_group)
+        btn_group_launch.grid(row=0, column=0, padx=5, sticky="e") # タイマーボタンの左に配置
+
         btn_timer_main = tk.Button(button_frame, text="タイマー付き一括終了", command=self._set_tab_timer_main)
         btn_timer_main.grid(row=0, column=1, padx=5) # column=1 に配置
 
@@ -97,9 +261,10 @@ class AppLauncher(TkinterDnD.Tk):
 
         # 最初に固定タブを作成
         self._create_status_tab()
+        self._create_resource_tab()
 
         # 保存されているアプリタブをstatus_tabの前に追加
-        app_tab_names = [name for name in self.app_groups.keys() if name != '起動中一覧']
+        app_tab_names = [name for name in self.core.app_groups.keys() if name not in FIXED_TABS]
         for name in app_tab_names:
             self._create_app_tab(name)
 
@@ -109,8 +274,8 @@ class AppLauncher(TkinterDnD.Tk):
         self.tab_control.bind("<Button-5>", self._on_mouse_scroll_tab_switch) # macOS scroll down
 
         # 最後に使用していたタブを選択
-        if self.last_active_tab and self.last_active_tab in self.tabs:
-            self.tab_control.select(self.tabs[self.last_active_tab])
+        if self.core.last_active_tab and self.core.last_active_tab in self.tabs:
+            self.tab_control.select(self.tabs[self.core.last_active_tab])
         else:
             # デフォルトで最初のタブを選択（「起動中一覧」以外）
             if self.tab_control.tabs():
@@ -128,6 +293,13 @@ class AppLauncher(TkinterDnD.Tk):
         insert_pos = self.tab_control.index(status_tab_frame)
         self.tab_control.insert(insert_pos, frame, text=name)
 
+    def _build_app_tab(self, name):
+        """タブの中身（スクロール領域・ボタン・ドロップ先）を作成する。作成済みなら何もしない"""
+        if name in self.built_tabs or name not in self.tabs:
+            return
+        self.built_tabs.add(name)
+        frame = self.tabs[name]
+
         canvas = tk.Canvas(frame)
         scrollbar = tk.Scrollbar(frame, orient="vertical", command=canvas.yview)
         scroll_frame = tk.Frame(canvas)
@@ -145,12 +317,72 @@ class AppLauncher(TkinterDnD.Tk):
     def _create_status_tab(self):
         status_tab = tk.Frame(self.tab_control)
         self.tab_control.add(status_tab, text="起動中一覧")
-        cols = ('グループ名', 'アプリ名', '状態')
+        cols = ('グループ名', 'アプリ名', '状態', '起動時間')
         self.status_tree = ttk.Treeview(status_tab, columns=cols, show='headings')
         for c in cols:
             self.status_tree.heading(c, text=c)
         self.status_tree.pack(expand=1, fill='both')
 
+    def _create_resource_tab(self):
+        resource_tab = tk.Frame(self.tab_control)
+        self.tab_control.add(resource_tab, text=RESOURCE_TAB_NAME)
+
+        control_frame = tk.Frame(resource_tab)
+        control_frame.pack(side="top", fill="x", padx=5, pady=5)
+        tk.Label(control_frame, text="計測間隔 (秒):").pack(side="left")
+        self.resource_interval_var = tk.DoubleVar(value=self.core.resource_interval)
+        tk.Spinbox(control_frame, from_=0.5, to=60, increment=0.5, width=6,
+                   textvariable=self.resource_interval_var).pack(side="left", padx=5)
+        tk.Button(control_frame, text="適用", command=self._apply_resource_interval).pack(side="left")
+
+        cols = ('グループ名', 'アプリ名', 'CPU%', 'メモリ(MB)', '読込(KB/s)', '書込(KB/s)', 'CPU履歴')
+        self.resource_tree = ttk.Treeview(resource_tab, columns=cols, show='headings')
+        for c in cols:
+            self.resource_tree.heading(c, text=c)
+            self.resource_tree.column(c, width=70 if c != 'CPU履歴' else 160)
+        self.resource_tree.pack(expand=1, fill='both')
+
+    def _apply_resource_interval(self):
+        try:
+            interval = float(self.resource_interval_var.get())
+        except (tk.TclError, ValueError):
+            messagebox.showinfo("確認", "計測間隔は数値で入力してください。")
+            return
+        self.core.resource_interval = max(0.5, interval)
+        self.resource_sampler.interval = self.core.resource_interval
+        self._save_apps()
+
+    def _update_resource_table(self):
+        """リソース監視タブが表示されている時だけ表を更新する"""
+        if not self.resource_tree:
+            return
+        try:
+            if self.tab_control.tab(self.tab_control.select(), "text") != RESOURCE_TAB_NAME:
+                return
+        except tk.TclError:
+            return
+
+        samples = self.resource_sampler.snapshot()
+        rows = {}
+        for tab, apps in self.core.app_status.items():
+            for app in apps:
+                sample = samples.get(app.get('track_key'))
+                if sample is None or app['status'] != '起動中':
+                    continue
+                spark = "".join(SPARK_CHARS[min(len(SPARK_CHARS) - 1, int(v / 100 * len(SPARK_CHARS)))] for v in sample['history'])
+                rows[app['row_id']] = (tab, os.path.basename(app['name']), f"{sample['cpu']:.1f}",
+                                       f"{sample['rss'] / 1024 / 1024:.1f}", f"{sample['read_rate'] / 1024:.1f}",
+                                       f"{sample['write_rate'] / 1024:.1f}", spark)
+
+        for row_id in self.resource_tree.get_children():
+            if row_id not in rows:
+                self.resource_tree.delete(row_id)
+        for row_id, values in rows.items():
+            if self.resource_tree.exists(row_id):
+                self.resource_tree.item(row_id, values=values)
+            else:
+                self.resource_tree.insert('', 'end', iid=row_id, values=values)
+
     def _add_app_button(self, parent_frame, tab_name, app_path):
         btn_frame = tk.Frame(parent_frame)
         
@@ -162,13 +394,46 @@ class AppLauncher(TkinterDnD.Tk):
             display_name = os.path.basename(folder_path) + " (フォルダ)"
             command_func = lambda p=folder_path: self._open_folder(p)
 
-        btn = tk.Button(btn_frame, text=display_name, width=30, anchor='w',
-                        command=command_func, bg="#ADD8E6") # Changed to pastel light blue
+        bg_color = "#ADD8E6" # Changed to pastel light blue
+        if app_path in self.broken_apps:
+            display_name += " (リンク切れ)"
+            bg_color = "#F4B6B6"
+
+        # 画像付きのボタンは width がピクセル単位になるので、アイコンが未取得でも空の画像を付けておく
+        icon_path = self._icon_source(app_path)
+        btn = tk.Button(btn_frame, text=" " + display_name, width=240, anchor='w', compound='left',
+                        image=self._icon_image(icon_path), command=command_func, bg=bg_color)
         btn.pack(side="left", fill="x", expand=True)
+        self.icon_buttons.setdefault(icon_path, []).append(btn)
         
         btn.bind("<Button-3>", lambda e, n=tab_name, a=app_path, b=btn_frame: self._on_app_right_click(e, n, a, b))
         btn_frame.pack(fill='x', padx=5, pady=5) # Increased vertical padding
 
+    def _icon_source(self, app_path):
+        if app_path.startswith(FOLDER_PREFIX):
+            return app_path[len(FOLDER_PREFIX):]
+        return app_path
+
+    def _icon_image(self, icon_path):
+        """ボタンに付ける画像。キャッシュに無ければ取り出しを頼み、それまでは空の画像を返す"""
+        if icon_path not in self.icon_images:
+            image = self.icon_cache.get(icon_path)
+            if image is None:
+                self.icon_cache.request([icon_path], lambda path, img: self.after(0, lambda: self._apply_icon(path, img)))
+                if self.blank_icon is None:
+                    self.blank_icon = tk.PhotoImage(width=ICON_SIZE, height=ICON_SIZE)
+                return self.blank_icon
+            self.icon_images[icon_path] = ImageTk.PhotoImage(image)
+        return self.icon_images[icon_path]
+
+    def _apply_icon(self, icon_path, image):
+        """バックグラウンドで取り出したアイコンを、表示中のボタンに反映する（UIスレッドで呼ぶ）"""
+        self.icon_images[icon_path] = ImageTk.PhotoImage(image)
+        buttons = [btn for btn in self.icon_buttons.get(icon_path, []) if btn.winfo_exists()]
+        self.icon_buttons[icon_path] = buttons
+        for btn in buttons:
+            btn.configure(image=self.icon_images[icon_path])
+
     def _refresh_tab_buttons(self, tab_name):
         frame = self.tabs[tab_name]
         try:
@@ -178,7 +443,7 @@ class AppLauncher(TkinterDnD.Tk):
             
         for w in scroll_frame.winfo_children():
             w.destroy()
-        for app in self.app_groups.get(tab_name, []):
+        for app in self.core.app_groups.get(tab_name, []):
             self._add_app_button(scroll_frame, tab_name, app)
         
         # タイマーボタンはメインウィンドウに移動
@@ -199,23 +464,30 @@ class AppLauncher(TkinterDnD.Tk):
         except tk.TclError:
             return # クリック位置がタブでない場合は何もしない
 
-        # 「起動中一覧」タブは削除不可
-        if tab_name == "起動中一覧":
+        # 固定タブは削除不可
+        if tab_name in FIXED_TABS:
             return
 
         menu = tk.Menu(self, tearoff=0)
+        menu.add_command(label=f"'{tab_name}' を一括起動", command=lambda: self._launch_group(tab_name))
+        menu.add_command(label="一括起動の設定...", command=lambda: self._edit_group_settings(tab_name))
+        menu.add_command(label="スケジュール設定...", command=lambda: self._edit_schedule(tab_name))
+        menu.add_separator()
         menu.add_command(label=f"タブ '{tab_name}' を削除", command=lambda: self._delete_tab(tab_index, tab_name))
         menu.post(event.x_root, event.y_root)
 
     def _on_tab_changed(self, event):
         try:
             selected_tab_name = self.tab_control.tab(self.tab_control.select(), "text")
-            self.last_active_tab = selected_tab_name # 最後にアクティブだったタブを保存
+            self.core.last_active_tab = selected_tab_name # 最後にアクティブだったタブを保存
             self._save_apps() # 設定を保存
+            self._build_app_tab(selected_tab_name) # 初めて表示するタブの中身を作成
 
             # 「起動中一覧」タブが選択された時のみ更新
             if selected_tab_name == "起動中一覧":
                 self._update_status_table()
+            elif selected_tab_name == RESOURCE_TAB_NAME:
+                self._update_resource_table()
         except tk.TclError:
             pass # ウィジェット破棄中のエラーを無視
 
@@ -244,27 +516,28 @@ class AppLauncher(TkinterDnD.Tk):
             f_normalized = os.path.normpath(os.path.abspath(f))
 
             if os.path.isfile(f_normalized):
-                if tab_name not in self.app_groups:
-                    self.app_groups[tab_name] = []
-                self.app_groups[tab_name].append(f_normalized)
+                if tab_name not in self.core.app_groups:
+                    self.core.app_groups[tab_name] = []
+                self.core.app_groups[tab_name].append(f_normalized)
                 self._add_app_button(scroll_frame, tab_name, f_normalized)
             elif os.path.isdir(f_normalized): # フォルダの場合
-                if tab_name not in self.app_groups:
-                    self.app_groups[tab_name] = []
-                self.app_groups[tab_name].append(FOLDER_PREFIX + f_normalized) # プレフィックスを付けて登録
+                if tab_name not in self.core.app_groups:
+                    self.core.app_groups[tab_name] = []
+                self.core.app_groups[tab_name].append(FOLDER_PREFIX + f_normalized) # プレフィックスを付けて登録
                 self._add_app_button(scroll_frame, tab_name, FOLDER_PREFIX + f_normalized)
         self._save_apps()
 
     def _on_app_right_click(self, event, tab_name, app_path, btn_frame):
         menu = tk.Menu(self, tearoff=0)
         menu.add_command(label="削除", command=lambda: self._delete_app(tab_name, app_path, btn_frame))
+        menu.add_command(label="先に起動するアプリを設定...", command=lambda: self._edit_app_depends(tab_name, app_path))
         
         # フォルダの場合は移動メニューを表示しない
         if not app_path.startswith(FOLDER_PREFIX):
-            index = self.app_groups[tab_name].index(app_path)
+            index = self.core.app_groups[tab_name].index(app_path)
             if index > 0:
                 menu.add_command(label="↑上に移動", command=lambda: self._move_app(tab_name, index, -1))
-            if index < len(self.app_groups[tab_name]) - 1:
+            if index < len(self.core.app_groups[tab_name]) - 1:
                 menu.add_command(label="↓下に移動", command=lambda: self._move_app(tab_name, index, 1))
         menu.post(event.x_root, event.y_root)
 
@@ -273,8 +546,8 @@ class AppLauncher(TkinterDnD.Tk):
     # -----------------------------
     def _add_new_tab(self):
         name = simpledialog.askstring("新規タブ", "タブ名を入力:")
-        if name and name not in self.app_groups:
-            self.app_groups[name] = []
+        if name and name not in self.core.app_groups and name not in FIXED_TABS:
+            self.core.app_groups[name] = []
             self._save_apps()
             self._create_app_tab(name)
 
@@ -283,8 +556,11 @@ class AppLauncher(TkinterDnD.Tk):
             self.tab_control.forget(tab_index)
             if tab_name in self.tabs:
                 del self.tabs[tab_name]
-            if tab_name in self.app_groups:
-                del self.app_groups[tab_name]
+            self.built_tabs.discard(tab_name)
+            if tab_name in self.core.app_groups:
+                del self.core.app_groups[tab_name]
+            self.core.schedules.pop(tab_name, None)
+            self.core.group_settings.pop(tab_name, None)
             self._save_apps()
 
     def _delete_current_tab(self):
@@ -292,8 +568,8 @@ class AppLauncher(TkinterDnD.Tk):
             selected_tab_index = self.tab_control.index(self.tab_control.select())
             selected_tab_name = self.tab_control.tab(selected_tab_index, "text")
 
-            if selected_tab_name == "起動中一覧":
-                messagebox.showinfo("確認", "「起動中一覧」タブは削除できません。")
+            if selected_tab_name in FIXED_TABS:
+                messagebox.showinfo("確認", f"「{selected_tab_name}」タブは削除できません。")
                 return
             
             self._delete_tab(selected_tab_index, selected_tab_name)
@@ -302,107 +578,211 @@ class AppLauncher(TkinterDnD.Tk):
 
     def _delete_app(self, tab_name, app_path, btn_frame):
         if messagebox.askyesno("確認", f"{os.path.basename(app_path)}を削除しますか？"):
-            if app_path in self.app_groups.get(tab_name, []):
-                self.app_groups[tab_name].remove(app_path)
+            if app_path in self.core.app_groups.get(tab_name, []):
+                self.core.app_groups[tab_name].remove(app_path)
                 self._save_apps()
                 btn_frame.destroy()
 
     def _move_app(self, tab_name, index, direction):
-        apps = self.app_groups[tab_name]
+        apps = self.core.app_groups[tab_name]
         new_index = index + direction
         apps[index], apps[new_index] = apps[new_index], apps[index]
         self._save_apps()
         self._refresh_tab_buttons(tab_name)
 
     def _run_single_app(self, app_path, tab_name):
-        if tab_name not in self.app_status:
-            self.app_status[tab_name] = []
+        self.core.run_single_app(tab_name, app_path)
+        self._update_status_table()
+
+    def _warm_lnk_cache(self):
+        """起動時にバックグラウンドでショートカットを解決し、リンク切れを確認する"""
+        all_paths = [app for apps in self.core.app_groups.values() for app in apps]
+        broken = self.core.lnk_cache.warm(all_paths)
+        self.after(0, lambda: self._mark_broken_apps(broken))
+
+    def _mark_broken_apps(self, broken):
+        changed_tabs = {tab for tab, apps in self.core.app_groups.items()
+                        if any((app in broken) != (app in self.broken_apps) for app in apps)}
+        self.broken_apps = broken
+        for tab_name in changed_tabs:
+            if tab_name in self.tabs:
+                self._refresh_tab_buttons(tab_name)
+
+    def _run_on_ui(self, func):
+        """別スレッドからの結果をUIスレッドで反映し、状態一覧を更新する（LauncherCore の deliver）"""
+        def run():
+            func()
+            self._update_status_table()
+        self.after(0, run)
 
+    def _handle_control_command(self, command):
+        """ControlServer のスレッドから呼ばれる。コマンドはUIスレッドで実行し、その結果を待って返す"""
+        done = threading.Event()
+        response = {}
+
+        def run():
+            try:
+                response.update(self.core.handle_command(command, self._run_on_ui))
+                self._update_status_table()
+            except Exception as e:
+                response.update({"ok": False, "error": str(e)})
+            finally:
+                done.set()
+
+        self.after(0, run)
+        if not done.wait(5.0):
+            return {"ok": False, "error": "ランチャーが応答しませんでした。"}
+        return response
+
+    def _launch_current_group(self):
         try:
-            target_path = app_path
-            if app_path.lower().endswith('.lnk'):
-                link = pylnk3.Lnk(app_path)
-                target_path = link.path
-            
-            subprocess.Popen([target_path])
-            self.app_status[tab_name].append({
-                'name': app_path, 
-                'status': '起動中',
-                'target_path': target_path
-            })
-        except Exception as e:
-            self.app_status[tab_name].append({'name': app_path, 'status': f'起動失敗: {e}', 'target_path': None})
-        self._update_status_table()
+            selected_tab_name = self.tab_control.tab(self.tab_control.select(), "text")
+        except tk.TclError:
+            messagebox.showinfo("確認", "有効なタブが選択されていません。")
+            return
+        if selected_tab_name in FIXED_TABS:
+            messagebox.showinfo("確認", f"「{selected_tab_name}」タブは一括起動できません。")
+            return
+        self._launch_group(selected_tab_name)
 
-    def _open_folder(self, folder_path):
+    def _launch_group(self, tab_name):
         try:
-            subprocess.Popen(['explorer', folder_path])
-        except Exception as e:
-            messagebox.showerror("エラー", f"フォルダを開けませんでした: {e}")
+            self.core.start_group_launch(tab_name, self._run_on_ui)
+        except ValueError as e:
+            messagebox.showinfo("確認", str(e))
+
+    def _edit_group_settings(self, tab_name):
+        settings = self.core.group_settings.get(tab_name, {})
+        concurrency = simpledialog.askinteger("一括起動の設定", f"{tab_name} の同時起動数:", minvalue=1,
+                                              initialvalue=settings.get("concurrency", 1))
+        if concurrency is None:
+            return
+        ready_timeout = simpledialog.askinteger("一括起動の設定", "起動完了を待つ最大秒数（0で待たない）:", minvalue=0,
+                                                initialvalue=int(settings.get("ready_timeout", 15)) if settings.get("wait_ready", True) else 0)
+        if ready_timeout is None:
+            return
+        settings.update({"concurrency": concurrency, "wait_ready": ready_timeout > 0, "ready_timeout": ready_timeout})
+        self.core.group_settings[tab_name] = settings
+        self._save_apps()
 
-    def _kill_apps_in_tab(self, tab_name):
-        apps_to_kill = [
-            app for app in self.app_status.get(tab_name, []) 
-            if app['status'] == '起動中' and app.get('target_path')
-        ]
-        
-        if not apps_to_kill:
+    def _run_scheduled_action(self, tab_name, action):
+        """スケジュールで指定された起動・終了を実行する"""
+        if tab_name not in self.core.app_groups:
             return
+        print(f"スケジュール実行: {tab_name} {action} ({datetime.now():%Y-%m-%d %H:%M})")
+        if action == "start":
+            self._launch_group(tab_name)
+        elif action == "stop":
+            self.core.kill_group(tab_name, self._run_on_ui) # 終了は別スレッドで行い、UIを止めない
+            self._update_status_table()
 
-        target_paths = {os.path.normcase(app['target_path']) for app in apps_to_kill}
+    def _edit_schedule(self, tab_name):
+        entries = self.core.schedules.get(tab_name, [])
+        current = {e["action"]: e for e in entries}
+        start_time = simpledialog.askstring("スケジュール設定", f"{tab_name} を起動する時刻 (HH:MM、空欄で無し):",
+                                            initialvalue=current.get("start", {}).get("time", ""))
+        if start_time is None:
+            return
+        stop_time = simpledialog.askstring("スケジュール設定", f"{tab_name} を終了する時刻 (HH:MM、空欄で無し):",
+                                           initialvalue=current.get("stop", {}).get("time", ""))
+        if stop_time is None:
+            return
+        days_default = next((e.get("days") for e in entries if e.get("days")), [0, 1, 2, 3, 4])
+        days_text = simpledialog.askstring("スケジュール設定", f"曜日 ({'・'.join(f'{i}={n}' for i, n in enumerate(WEEKDAY_NAMES))}、例: 0-4):",
+                                           initialvalue=",".join(str(d) for d in days_default))
+        if days_text is None:
+            return
 
-        for proc in psutil.process_iter(['pid', 'exe']):
-            try:
-                if proc.info['exe'] and os.path.normcase(proc.info['exe']) in target_paths:
-                    parent = psutil.Process(proc.info['pid'])
-                    children = parent.children(recursive=True)
-                    for child in children:
-                        child.kill()
-                    parent.kill()
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-            except Exception as e:
-                print(f"プロセス検索・終了中にエラー: {e}")
+        try:
+            days = set()
+            for part in days_text.replace(" ", "").split(","):
+                if not part:
+                    continue
+                if "-" in part:
+                    first, last = (int(v) for v in part.split("-"))
+                    days.update(range(first, last + 1))
+                else:
+                    days.add(int(part))
+            if not days <= set(range(7)):
+                raise ValueError(days_text)
+            new_entries = []
+            for action, text in (("start", start_time.strip()), ("stop", stop_time.strip())):
+                if text:
+                    datetime.strptime(text, "%H:%M")
+                    new_entries.append({"action": action, "time": text, "days": sorted(days)})
+        except ValueError:
+            messagebox.showerror("エラー", "時刻は HH:MM、曜日は 0〜6 の数字で入力してください。")
+            return
+
+        if new_entries:
+            self.core.schedules[tab_name] = new_entries
+        else:
+            self.core.schedules.pop(tab_name, None)
+        self._save_apps()
+        self.launch_scheduler.reload()
 
-        for app in self.app_status.get(tab_name, []):
-            if app['status'] == '起動中':
-                app['status'] = 'タイマー終了'
+    def _edit_app_depends(self, tab_name, app_path):
+        """このアプリより先に起動しておくアプリを選ぶダイアログ"""
+        others = [a for a in self.core.app_groups.get(tab_name, []) if a != app_path]
+        if not others:
+            messagebox.showinfo("確認", "同じタブに他のアプリがありません。")
+            return
+        depends = self.core.group_settings.setdefault(tab_name, {}).setdefault("depends", {})
+
+        dialog = tk.Toplevel(self)
+        dialog.title(f"{os.path.basename(app_path)} より先に起動")
+        dialog.grab_set()
+        listbox = tk.Listbox(dialog, selectmode=tk.MULTIPLE, width=50)
+        for i, other in enumerate(others):
+            listbox.insert(tk.END, os.path.basename(other))
+            if other in depends.get(app_path, []):
+                listbox.selection_set(i)
+        listbox.pack(fill="both", expand=True, padx=5, pady=5)
+
+        def on_ok():
+            selected = [others[i] for i in listbox.curselection()]
+            if selected:
+                depends[app_path] = selected
+            else:
+                depends.pop(app_path, None)
+            self._save_apps()
+            dialog.destroy()
+
+        tk.Button(dialog, text="OK", command=on_ok).pack(pady=5)
+
+    def _open_folder(self, folder_path):
+        try:
+            subprocess.Popen(['explorer', folder_path])
+        except Exception as e:
+            messagebox.showerror("エラー", f"フォルダを開けませんでした: {e}")
 
     def _update_status_table(self):
         if not self.status_tree:
             return
 
-        try:
-            running_exe_paths = {os.path.normcase(p.info['exe']) for p in psutil.process_iter(['exe']) if p.info['exe']}
-        except Exception:
-            running_exe_paths = set()
-
-        for tab, apps in self.app_status.items():
-            for app_status in apps:
-                if app_status['status'] == '起動中':
-                    target_path = app_status.get('target_path')
-                    if not target_path or os.path.normcase(target_path) not in running_exe_paths:
-                        app_status['status'] = 'ユーザー終了'
-
-        for item in self.status_tree.get_children():
-            self.status_tree.delete(item)
-        
-        combined_list = []
-        for tab, apps in self.app_status.items():
-            for a in apps:
-                combined_list.append({'tab': tab, 'name': a['name'], 'status': a['status']})
-        
-        combined_list.sort(key=lambda x: (x['status'] != '起動中', x['status'] != 'タイマー終了', x['status'] != 'ユーザー終了'))
-        for app in combined_list:
-            display_name = os.path.basename(app['name'])
-            if app['name'].startswith(FOLDER_PREFIX):
-                display_name = os.path.basename(app['name'][len(FOLDER_PREFIX):]) + " (フォルダ)"
-            self.status_tree.insert('', 'end', values=(app['tab'], display_name, app['status']))
-
-    def _periodic_update(self):
-        # _update_status_table() は _on_tab_changed でのみ呼び出す
-        # self._update_status_table()
-        self.after(1000, self._periodic_update)
+        combined_list = self.core.status_rows()
+
+        # 変化のあった行だけを更新する
+        wanted_ids = {app['row_id'] for app in combined_list}
+        for row_id in list(self.status_rows):
+            if row_id not in wanted_ids:
+                self.status_tree.delete(row_id)
+                del self.status_rows[row_id]
+
+        for index, app in enumerate(combined_list):
+            latency = f"{app['latency'] * 1000:.0f} ms" if app['latency'] is not None else ""
+            values = (app['tab'], app['name'], app['status'], latency)
+            row_id = app['row_id']
+
+            if row_id not in self.status_rows:
+                self.status_tree.insert('', index, iid=row_id, values=values)
+                self.status_rows[row_id] = values
+                continue
+            if self.status_rows[row_id] != values:
+                self.status_tree.item(row_id, values=values)
+                self.status_rows[row_id] = values
+            if self.status_tree.index(row_id) != index:
+                self.status_tree.move(row_id, '', index)
 
     # -----------------------------
     # タイマーとトレイ関連
@@ -410,8 +790,8 @@ class AppLauncher(TkinterDnD.Tk):
     def _set_tab_timer_main(self):
         try:
             selected_tab_name = self.tab_control.tab(self.tab_control.select(), "text")
-            if selected_tab_name == "起動中一覧":
-                messagebox.showinfo("確認", "「起動中一覧」タブではタイマーを設定できません。")
+            if selected_tab_name in FIXED_TABS:
+                messagebox.showinfo("確認", f"「{selected_tab_name}」タブではタイマーを設定できません。")
                 return
             self._set_tab_timer(selected_tab_name)
         except tk.TclError:
@@ -431,7 +811,7 @@ class AppLauncher(TkinterDnD.Tk):
             messagebox.showinfo("確認", f"{tab_name}のタイマーは既に実行中です。")
             return
         
-        is_running = any(app['status'] == '起動中' for app in self.app_status.get(tab_name, []))
+        is_running = any(app['status'] == '起動中' for app in self.core.app_status.get(tab_name, []))
         if not is_running:
             messagebox.showinfo("確認", f"{tab_name}で起動中のアプリがありません。先にアプリを起動してください。")
             return
@@ -456,40 +836,41 @@ class AppLauncher(TkinterDnD.Tk):
         
         threading.Thread(target=icon.run, daemon=True).start()
 
-        self.tab_timers[tab_name] = seconds
         self.tab_running_flags[tab_name] = True
         
-        self.after(100, lambda: self._timer_countdown(tab_name))
-
-    def _timer_countdown(self, tab_name):
-        if self.tab_timers.get(tab_name, 0) > 0 and self.tab_running_flags.get(tab_name, False):
-            self.tab_timers[tab_name] -= 1
-            
-            seconds = self.tab_timers[tab_name]
-            mins = seconds // 60 # Only minutes are needed
-            
-            title_text = f"残り: {mins:02d}分 - {APP_TITLE}"
-            self.title(title_text)
+        self.after(0, lambda: self.timer_service.start(tab_name, seconds))
 
-            if self.tab_tray_icons.get(tab_name):
-                self.tab_tray_icons[tab_name].title = f"{tab_name} 残り: {mins:02d}分"
+    def _on_timer_tick(self, tab_name, mins):
+        """残り時間の「分」が変わった時だけタイトルとトレイを更新する"""
+        if not self.tab_running_flags.get(tab_name, False):
+            return
+        title_text = f"残り: {mins:02d}分 - {APP_TITLE}"
+        self.title(title_text)
 
-            self.after(1000, lambda: self._timer_countdown(tab_name))
-        else:
-            self._stop_timer(tab_name)
+        if self.tab_tray_icons.get(tab_name):
+            self.tab_tray_icons[tab_name].title = f"{tab_name} 残り: {mins:02d}分"
 
     def _stop_timer(self, tab_name):
+        self.timer_service.cancel(tab_name)
         if self.tab_running_flags.get(tab_name, False):
             self.tab_running_flags[tab_name] = False
             if self.tab_tray_icons.get(tab_name):
                 self.tab_tray_icons[tab_name].stop()
                 del self.tab_tray_icons[tab_name]
-            self._kill_apps_in_tab(tab_name)
+            # 終了は別スレッドで行い、終わったら所要時間を知らせる
+            self.core.kill_group(tab_name, self._run_on_ui, lambda timings: self._on_timer_killed(tab_name, timings))
             self.title(APP_TITLE)
-            self.deiconify()
             self._update_status_table()
-            messagebox.showinfo("タイマー終了", f"{tab_name} のタイマーが終了しました。")
+
+    def _on_timer_killed(self, tab_name, timings):
+        self.deiconify()
+        details = "\n".join(f"{name}: {seconds:.2f}秒" for name, seconds in timings)
+        messagebox.showinfo("タイマー終了", f"{tab_name} のタイマーが終了しました。" + (f"\n\n{details}" if details else ""))
 
 if __name__ == "__main__":
-    app = AppLauncher()
+    parser = argparse.ArgumentParser(description=APP_TITLE)
+    parser.add_argument("--profile-startup", action="store_true", help="起動にかかった時間を表示する")
+    args = parser.parse_args()
+
+    app = AppLauncher(profile_startup=args.profile_startup)
     app.mainloop()
@@ -0,0 +1,68 @@
+"""
+起動中のランチャー(launcher.py)をコマンドラインから操作する。
+
+  python launcher_cli.py launch <グループ名>   グループを一括起動する
+  python launcher_cli.py stop <グループ名>     グループから起動したアプリを終了する
+  python launcher_cli.py status [--json]       起動状態を表示する
+
+ランチャーが起動時に書き出すトークン（apps.json と同じ場所の control_token）を読んで送るので、
+ランチャーと同じフォルダで実行するか --token-file で指定する。
+"""
+import argparse
+import json
+import sys
+import time
+from launcher_control import CONTROL_PORT, CONTROL_TOKEN_FILE, read_token, send_command
+
+def main():
+    parser = argparse.ArgumentParser(description="起動中のランチャーを操作します。")
+    parser.add_argument("--port", type=int, default=CONTROL_PORT, help="ランチャーの待ち受けポート")
+    parser.add_argument("--token-file", default=CONTROL_TOKEN_FILE,
+                        help="ランチャーが書き出したトークンのファイル（apps.json と同じ場所）")
+    parser.add_argument("--timing", action="store_true", help="応答までの時間を表示する")
+    commands = parser.add_subparsers(dest="command", required=True)
+    launch_parser = commands.add_parser("launch", help="グループを一括起動する")
+    launch_parser.add_argument("group")
+    stop_parser = commands.add_parser("stop", help="グループから起動したアプリを終了する")
+    stop_parser.add_argument("group")
+    status_parser = commands.add_parser("status", help="起動状態を表示する")
+    status_parser.add_argument("--json", action="store_true", help="JSONで出力する")
+    args = parser.parse_args()
+
+    command = {"command": args.command}
+    if args.command in ("launch", "stop"):
+        command["group"] = args.group
+
+    try:
+        token = read_token(args.token_file)
+    except OSError as e:
+        print(f"トークンファイルを読めませんでした。ランチャーが起動しているか確認してください。({e})", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    try:
+        response = send_command(command, token, port=args.port)
+    except OSError as e:
+        print(f"ランチャーに接続できませんでした。起動しているか確認してください。({e})", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - start
+
+    if not response.get("ok"):
+        print(f"エラー: {response.get('error')}", file=sys.stderr)
+        return 1
+    if args.command == "status":
+        if args.json:
+            print(json.dumps(response, ensure_ascii=False, indent=2))
+        else:
+            for app in response["apps"]:
+                print(f"{app['tab']}\t{app['name']}\t{app['status']}")
+    elif args.command == "launch":
+        print(f"{args.group} の一括起動を開始しました。")
+    else:
+        print(f"{args.group}: {response['stopped']} 件のアプリを終了しています。")
+    if args.timing:
+        print(f"応答時間: {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
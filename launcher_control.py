@@ -0,0 +1,104 @@
+"""
+起動中のランチャーとコマンドラインツールの間の通信（127.0.0.1 上で1行ずつのJSONをやり取りする）。
+launcher_cli.py がすぐ起動できるように、標準ライブラリだけを使う。
+同じPCの他のユーザーやブラウザから操作されないように、ランチャーは起動のたびに乱数のトークンを
+設定ファイルと同じフォルダの CONTROL_TOKEN_FILE に書き出し、コマンドにはそのトークンを付けて送る。
+"""
+import hmac
+import json
+import os
+import secrets
+import socket
+import threading
+
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 47651 # 起動中のランチャーがコマンドを待ち受けるポート
+CONTROL_TOKEN_FILE = "control_token" # apps.json と同じ場所に置く
+
+def read_token(token_path):
+    """トークンファイルを読む。無ければ OSError"""
+    with open(token_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+class ControlServer:
+    """
+    ローカル(127.0.0.1)でコマンドを待ち受けるサーバー。
+    1行のJSONを受け取り、handler(command) の戻り値を1行のJSONで返す。handler は接続ごとのスレッドから呼ばれる。
+    "token" がトークンファイルの内容と一致しないコマンドは handler に渡さずに断る。
+    """
+    def __init__(self, handler, token_path, host=CONTROL_HOST, port=CONTROL_PORT):
+        self.handler = handler
+        self.token_path = token_path
+        self.token = None
+        self.host = host
+        self.port = port
+        self.sock = None
+
+    def start(self):
+        """待ち受けを開始する。ポートが使用中（別のランチャーが起動中など）の場合は OSError"""
+        sock = socket.create_server((self.host, self.port))
+        try:
+            self.token = secrets.token_hex(32)
+            self._write_token()
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _write_token(self):
+        # 本人だけが読めるファイルとして作る（Windows ではユーザーのフォルダの権限に従う）
+        if os.path.exists(self.token_path):
+            os.remove(self.token_path)
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.token)
+
+    def stop(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR) # accept() で待っているスレッドを起こす
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+            try:
+                os.remove(self.token_path)
+            except OSError:
+                pass
+
+    def _serve(self, sock):
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return # stop() で閉じられた
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            conn.settimeout(5.0)
+            try:
+                with conn.makefile("r", encoding="utf-8") as reader:
+                    command = json.loads(reader.readline())
+                token = command.pop("token", None) if isinstance(command, dict) else None
+                if not isinstance(token, str) or not hmac.compare_digest(token, self.token):
+                    response = {"ok": False, "error": "トークンが一致しません。"}
+                else:
+                    response = self.handler(command)
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            try:
+                conn.sendall((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            except OSError:
+                pass
+
+def send_command(command, token, host=CONTROL_HOST, port=CONTROL_PORT, timeout=5.0):
+    """起動中のランチャーにトークンを付けてコマンドを送り、応答(dict)を返す。接続できない場合は OSError"""
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall((json.dumps(dict(command, token=token), ensure_ascii=False) + "\n").encode("utf-8"))
+        with conn.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("ランチャーから応答がありませんでした。")
+    return json.loads(line)
@@ -0,0 +1,787 @@
+"""
+起動順＆一括タイマーランチャーのUIに依存しない部分。
+launcher.py のウィンドウから使い、launcher_cli.py からの操作も LauncherCore.handle_command で処理する。
+"""
+import threading
+import subprocess
+import time
+import json
+import os
+import tempfile
+import ctypes
+import psutil
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime, timedelta
+
+APP_JSON = "apps.json"
+LNK_CACHE_JSON = "lnk_cache.json" # apps.json と同じ場所に保存する
+FOLDER_PREFIX = "folder:"
+STATUS_PRIORITY = {'起動中': 0, 'タイマー終了': 1, '停止': 1, 'ユーザー終了': 2}
+
+def load_pylnk3():
+    """pylnk3 は .lnk を扱うときだけ読み込む（無くても .lnk 以外は起動できる）"""
+    try:
+        import pylnk3
+    except ImportError as e:
+        raise ImportError("ショートカット(.lnk)を読むには pylnk3 が必要です (pip install pylnk3)") from e
+    return pylnk3
+
+def write_text_atomic(path, text):
+    """
+    一時ファイルに書き込んでから置き換えるので、途中で落ちても元のファイルが壊れない。
+    一時ファイルは呼び出しごとに別の名前で作るので、複数のスレッドから同時に呼んでもよい。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class ProcessTracker:
+    """
+    ランチャーから起動したプロセス(PID)とその子孫だけを監視するクラス。
+    システム全体のプロセスを走査せずに起動・終了を検出する。
+    poll() は psutil を呼ぶので UI のスレッドでは呼ばない（LauncherCore.start_tracker_polling のスレッドから呼ぶ）。
+    終了したエントリは、起動したプロセスを回収し終えたら捨てる。
+    """
+    def __init__(self, children_refresh_interval=5.0):
+        self.entries = {}
+        self.events = []
+        self.next_key = 1
+        self.children_refresh_interval = children_refresh_interval
+        self.lock = threading.Lock()
+
+    def track(self, popen):
+        """subprocess.Popen で起動したプロセスを登録し、追跡用のキーを返す"""
+        with self.lock:
+            key = self.next_key
+            self.next_key += 1
+            tree = {}
+            try:
+                tree[popen.pid] = psutil.Process(popen.pid)
+            except psutil.Error:
+                pass
+            # ランチャー役のプロセスがすぐに子を起動して終わる場合に備えて、登録時にも子孫を集めておく
+            self._collect_children(list(tree.values()), tree)
+            self.entries[key] = {
+                'popen': popen,
+                'tree': tree,
+                'running': True,
+                'children_checked': time.monotonic(),
+            }
+            self.events.append(('start', key))
+            return key
+
+    def poll(self):
+        """追跡中のプロセスの生存確認と子孫の更新を行い、(イベント, キー) のリストを返す"""
+        now = time.monotonic()
+        with self.lock:
+            finished = []
+            for key, entry in self.entries.items():
+                if not entry['running']:
+                    # 起動したプロセスを回収できたら、もう何も参照しないので捨てる
+                    if entry['popen'].poll() is not None:
+                        finished.append(key)
+                    continue
+                entry['popen'].poll() # 終了した子プロセスを回収する
+                alive = {pid: p for pid, p in entry['tree'].items() if self._is_alive(p)}
+
+                # 子孫の走査はコストが高いので一定間隔ごとに行う
+                if alive and now - entry['children_checked'] >= self.children_refresh_interval:
+                    entry['children_checked'] = now
+                    self._collect_children(list(alive.values()), alive)
+                elif not alive and entry['tree']:
+                    # 終了とみなす前に、前回までのツリーから子孫を探し直す（走査の間に親だけ終わった場合）
+                    entry['children_checked'] = now
+                    found = {}
+                    self._collect_children(list(entry['tree'].values()), found)
+                    alive = {pid: p for pid, p in found.items() if self._is_alive(p)}
+
+                entry['tree'] = alive
+                if not alive:
+                    entry['running'] = False
+                    self.events.append(('exit', key))
+                    if entry['popen'].poll() is not None:
+                        finished.append(key)
+
+            for key in finished:
+                del self.entries[key]
+            events, self.events = self.events, []
+        return events
+
+    def refresh_children(self, key):
+        """指定したプロセスツリーの子孫を今すぐ更新する（終了処理の直前などに使う）"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry or not entry['running']:
+                return
+            entry['children_checked'] = time.monotonic()
+            self._collect_children(list(entry['tree'].values()), entry['tree'])
+
+    @staticmethod
+    def _collect_children(procs, tree):
+        """procs の子孫を tree (pid -> psutil.Process) に追加する"""
+        for proc in procs:
+            try:
+                for child in proc.children(recursive=True):
+                    tree.setdefault(child.pid, child)
+            except psutil.Error:
+                pass
+
+    def terminate(self, key, timeout=3.0):
+        """
+        追跡中のプロセスツリーだけを終了する。
+        terminate → timeout 秒待機 → 残っていれば kill の順に段階的に終了し、かかった秒数を返す。
+        """
+        start = time.perf_counter()
+        self.refresh_children(key)
+        procs = self.processes(key)
+        for proc in reversed(procs): # 子プロセスから先に終了する
+            try:
+                proc.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(procs, timeout=timeout)
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.Error:
+                pass
+        if alive:
+            psutil.wait_procs(alive, timeout=timeout)
+        return time.perf_counter() - start
+
+    def processes(self, key):
+        """追跡中のプロセスツリー（psutil.Process のリスト）を返す"""
+        with self.lock:
+            entry = self.entries.get(key)
+            return list(entry['tree'].values()) if entry else []
+
+    def is_running(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return bool(entry and entry['running'])
+
+    def running_keys(self):
+        """追跡中（終了していない）キーの一覧を返す（別スレッドから entries を直接たどらない）"""
+        with self.lock:
+            return [key for key, entry in self.entries.items() if entry['running']]
+
+    @staticmethod
+    def _is_alive(proc):
+        try:
+            return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+
+class LnkCache:
+    """
+    ショートカット(.lnk)の解決結果を、リンクのパスと更新日時をキーにキャッシュするクラス。
+    同じリンクを起動のたびに pylnk3 で読み直さないようにし、リンク切れの検出にも使う。
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock() # save() は起動時の確認スレッドと終了処理の両方から呼ばれる
+        try:
+            if os.path.exists(cache_path):
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"ショートカットキャッシュの読み込みに失敗しました: {e}")
+
+    def resolve(self, link_path):
+        """リンク先のパスを返す（リンクが変更されていなければキャッシュを使う）"""
+        mtime = os.path.getmtime(link_path)
+        with self.lock:
+            entry = self.entries.get(link_path)
+            if entry and entry['mtime'] == mtime:
+                return entry['target']
+
+        target = load_pylnk3().Lnk(link_path).path
+        with self.lock:
+            self.entries[link_path] = {'mtime': mtime, 'target': target, 'exists': os.path.exists(target)}
+            self.dirty = True
+        return target
+
+    def validate(self, app_path):
+        """登録されたパス（.lnk ならリンク先も）が存在するか確認する"""
+        if app_path.startswith(FOLDER_PREFIX):
+            return os.path.isdir(app_path[len(FOLDER_PREFIX):])
+        if not os.path.exists(app_path):
+            return False
+        if app_path.lower().endswith('.lnk'):
+            try:
+                target = self.resolve(app_path)
+            except ImportError:
+                return True # pylnk3 が無ければリンク先は確かめられないので、リンク切れ扱いにしない
+            except Exception:
+                return False
+            exists = os.path.exists(target)
+            with self.lock:
+                if self.entries[app_path].get('exists') != exists:
+                    self.entries[app_path]['exists'] = exists
+                    self.dirty = True
+            return exists
+        return True
+
+    def warm(self, app_paths):
+        """すべてのパスを解決・確認してキャッシュを保存し、リンク切れのパスの集合を返す"""
+        broken = {path for path in app_paths if not self.validate(path)}
+        self.save()
+        return broken
+
+    def save(self):
+        # 古い内容で新しい内容を上書きしないように、内容の取り出しから書き込みまでを1つずつ行う
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                data = dict(self.entries)
+                self.dirty = False
+            try:
+                write_text_atomic(self.cache_path, json.dumps(data, ensure_ascii=False))
+            except OSError as e:
+                print(f"ショートカットキャッシュの保存に失敗しました: {e}")
+
+class ResourceSampler:
+    """
+    追跡中のプロセスツリーのCPU使用率・メモリ(RSS)・I/O速度を1本のスレッドで定期的に計測するクラス。
+    psutil.Process は ProcessTracker が保持しているものを使い回し、前回値との差分から速度を求める。
+    """
+    def __init__(self, tracker, interval=2.0, history_size=60, on_sample=None):
+        self.tracker = tracker
+        self.interval = interval
+        self.history_size = history_size
+        self.on_sample = on_sample
+        self.samples = {} # 追跡キー -> 最新の計測値と履歴
+        self.prev_io = {} # pid -> (read_bytes, write_bytes, 計測時刻)
+        self.cpu_count = psutil.cpu_count() or 1
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def snapshot(self):
+        with self.lock:
+            return {key: dict(sample, history=list(sample['history'])) for key, sample in self.samples.items()}
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            keys = self.tracker.running_keys()
+            if not keys and not self.samples:
+                continue
+            for key in keys:
+                self._sample(key)
+            with self.lock:
+                for key in [k for k in self.samples if k not in keys]:
+                    del self.samples[key]
+            live_pids = {p.pid for key in keys for p in self.tracker.processes(key)}
+            for pid in [pid for pid in self.prev_io if pid not in live_pids]:
+                del self.prev_io[pid]
+            if self.on_sample:
+                self.on_sample()
+
+    def _sample(self, key):
+        cpu = rss = read_rate = write_rate = 0.0
+        now = time.monotonic()
+        for proc in self.tracker.processes(key):
+            try:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    io = proc.io_counters() if hasattr(proc, 'io_counters') else None
+            except psutil.Error:
+                continue
+            if io is None:
+                continue
+            prev = self.prev_io.get(proc.pid)
+            self.prev_io[proc.pid] = (io.read_bytes, io.write_bytes, now)
+            if prev and now > prev[2]:
+                read_rate += (io.read_bytes - prev[0]) / (now - prev[2])
+                write_rate += (io.write_bytes - prev[1]) / (now - prev[2])
+
+        cpu /= self.cpu_count
+        with self.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = {'history': deque(maxlen=self.history_size)}
+            sample.update({'cpu': cpu, 'rss': rss, 'read_rate': read_rate, 'write_rate': write_rate})
+            sample['history'].append(cpu)
+
+class LaunchScheduler:
+    """
+    タブごとの起動・終了スケジュール（曜日と時刻）を実行するクラス。
+    次の予定時刻まで眠るだけでポーリングはしない。
+    now_func / wait_func を差し替えれば、実時間を使わずに（偽の時計で）動かせる。
+    スケジュールの形式: {タブ名: [{"action": "start" または "stop", "time": "HH:MM", "days": [0-6]}]}
+    """
+    def __init__(self, schedules, on_action, now_func=datetime.now, wait_func=None, max_sleep=3600.0):
+        self.schedules = schedules
+        self.on_action = on_action # (タブ名, アクション)
+        self.now_func = now_func
+        self.wake_event = threading.Event()
+        self.wait_func = wait_func or self.wake_event.wait
+        self.max_sleep = max_sleep # 時計の変更に備えて、最長でもこの秒数ごとに起きる
+        self.stopped = False
+
+    @staticmethod
+    def _next_time(entry, after):
+        """entry の次の実行時刻（after より後）を返す"""
+        hour, minute = (int(v) for v in entry["time"].split(":"))
+        days = entry.get("days") or range(7)
+        for offset in range(8):
+            candidate = (after + timedelta(days=offset)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if candidate > after and candidate.weekday() in days:
+                return candidate
+        return None
+
+    def next_due(self, after):
+        """after より後で最も早い予定を (時刻, タブ名, アクション) で返す"""
+        upcoming = []
+        for tab_name, entries in list(self.schedules.items()):
+            for entry in entries:
+                try:
+                    due = self._next_time(entry, after)
+                except (KeyError, ValueError):
+                    continue
+                if due:
+                    upcoming.append((due, tab_name, entry["action"]))
+        return min(upcoming) if upcoming else None
+
+    def run_pending(self, since, until):
+        """since より後、until 以前の予定をすべて実行し、実行した件数を返す"""
+        count = 0
+        due = self.next_due(since)
+        while due and due[0] <= until:
+            self.on_action(due[1], due[2])
+            count += 1
+            due = self.next_due(due[0])
+        return count
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        last = self.now_func()
+        while not self.stopped:
+            due = self.next_due(last)
+            timeout = self.max_sleep
+            if due:
+                timeout = min(timeout, max(0.0, (due[0] - self.now_func()).total_seconds()))
+            self.wait_func(timeout)
+            self.wake_event.clear()
+            if self.stopped:
+                break
+            now = self.now_func()
+            self.run_pending(last, now)
+            last = now
+
+    def reload(self):
+        """スケジュールが変更された時に呼ぶ（眠っているスレッドを起こして次の予定を計算し直す）"""
+        self.wake_event.set()
+
+    def stop(self):
+        self.stopped = True
+        self.wake_event.set()
+
+def _window_pids():
+    """表示中のトップレベルウィンドウを持つプロセスのPID一覧を返す（Windowsのみ）"""
+    pids = set()
+    user32 = ctypes.windll.user32
+    enum_proc = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_void_p, ctypes.c_void_p)
+
+    def callback(hwnd, _):
+        if user32.IsWindowVisible(hwnd):
+            pid = ctypes.c_ulong()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            pids.add(pid.value)
+        return True
+
+    user32.EnumWindows(enum_proc(callback), 0)
+    return pids
+
+def wait_until_ready(pid, timeout=15.0, interval=0.2, cancel_event=None, settle_samples=5):
+    """
+    起動したプロセスが「準備完了」になるまで待つ。準備完了なら True を返す。
+    Windowsではプロセスツリーのどれかがウィンドウを表示するまで待つ。
+    それ以外のOSには確かな目安が無いので、プロセスツリー全体のCPU使用率が settle_samples 回続けて
+    5%未満になるまで（最短でも interval × settle_samples 秒）待つだけの目安にとどまる。
+    プロセスが終了した場合や cancel_event がセットされた場合もそこで待機をやめて False を返す。
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        proc = psutil.Process(pid)
+    except psutil.Error:
+        return False
+
+    cpu_procs = {} # pid -> psutil.Process（cpu_percent は前回呼び出しからの値なので同じオブジェクトを使い続ける）
+    quiet = 0
+    while time.monotonic() < deadline:
+        if cancel_event is not None:
+            if cancel_event.wait(interval):
+                return False
+        else:
+            time.sleep(interval)
+        try:
+            if not proc.is_running():
+                return False
+            tree = [proc] + proc.children(recursive=True)
+        except psutil.Error:
+            return False
+        if os.name == 'nt':
+            if {p.pid for p in tree} & _window_pids():
+                return True
+            continue
+
+        cpu = 0.0
+        fresh = False
+        for p in tree:
+            try:
+                if p.pid in cpu_procs:
+                    cpu += cpu_procs[p.pid].cpu_percent(None)
+                else:
+                    cpu_procs[p.pid] = p
+                    p.cpu_percent(None) # 初回は基準を取るだけ（常に 0 が返る）ので、この回は数えない
+                    fresh = True
+            except psutil.Error:
+                pass
+        quiet = 0 if fresh or cpu >= 5.0 else quiet + 1
+        if quiet >= settle_samples:
+            return True
+    return False
+
+class GroupLauncher:
+    """
+    タブ内のアプリを依存関係に従って段階的に起動するクラス。
+    依存先がすべて起動した段からまとめて起動し、同時起動数を concurrency までに制限する。
+    起動結果は起動直後に on_result で知らせ（追跡・停止できるように）、準備完了はその後に待つ。
+    cancel() すると、まだ起動していないアプリは起動せず、準備完了の待機もやめる。
+    """
+    def __init__(self, launch_func, on_result, concurrency=1, wait_ready=True, ready_timeout=15.0):
+        self.launch_func = launch_func # app_path -> Popen (フォルダなど追跡しないものは None)
+        self.on_result = on_result # (app_path, Popen または例外, 起動までの秒数) を受け取る
+        self.concurrency = max(1, concurrency)
+        self.wait_ready = wait_ready
+        self.ready_timeout = ready_timeout
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @staticmethod
+    def plan(apps, depends):
+        """依存関係から起動段階（同時に起動してよいアプリのリスト）の並びを作る"""
+        remaining = list(apps)
+        started = set()
+        stages = []
+        while remaining:
+            stage = [app for app in remaining if all(d in started or d not in apps for d in depends.get(app, []))]
+            if not stage:
+                raise ValueError("依存関係が循環しています: " + ", ".join(os.path.basename(a) for a in remaining))
+            stages.append(stage)
+            started.update(stage)
+            remaining = [app for app in remaining if app not in started]
+        return stages
+
+    def run(self, apps, depends=None):
+        """すべての段階を順に起動する（呼び出し元スレッドをブロックするので別スレッドで使う）"""
+        for stage in self.plan(apps, depends or {}):
+            if self.cancelled.is_set():
+                return
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(stage))) as executor:
+                list(executor.map(self._launch_one, stage))
+
+    def _launch_one(self, app_path):
+        if self.cancelled.is_set():
+            return
+        start = time.perf_counter()
+        try:
+            proc = self.launch_func(app_path)
+        except Exception as e:
+            self.on_result(app_path, e, time.perf_counter() - start)
+            return
+        self.on_result(app_path, proc, time.perf_counter() - start)
+        # 次の段は準備完了を待ってから起動する
+        if proc is not None and self.wait_ready:
+            wait_until_ready(proc.pid, self.ready_timeout, cancel_event=self.cancelled)
+
+def display_name(app_path):
+    """状態一覧などに表示する名前（フォルダは末尾に「(フォルダ)」を付ける）"""
+    if app_path.startswith(FOLDER_PREFIX):
+        return os.path.basename(app_path[len(FOLDER_PREFIX):]) + " (フォルダ)"
+    return os.path.basename(app_path)
+
+class LauncherCore:
+    """
+    グループの保存・一括起動・終了と起動状態の集計をまとめたクラス（UIに依存しない）。
+    app_status などの変更は、このクラスを持つスレッド（ランチャーではTkのUIスレッド）からだけ行う。
+    別スレッドの処理結果は deliver(func) に渡し、持ち主のスレッドで func を実行してもらう。
+    """
+    def __init__(self, app_json=APP_JSON):
+        self.app_json = app_json
+        self.app_groups = {}
+        self.last_active_tab = None
+        self.group_settings = {}
+        self.schedules = {}
+        self.resource_interval = 2.0
+        self.app_status = {}
+        self.group_launching = {} # タブ名 -> 一括起動中の GroupLauncher
+        self.next_row_id = 1
+        self.last_saved_text = None
+        self.process_tracker = ProcessTracker()
+        self.tracker_stop = threading.Event()
+        self.lnk_cache = LnkCache(os.path.join(os.path.dirname(os.path.abspath(app_json)), LNK_CACHE_JSON))
+
+    # --- 設定の読み書き ---
+    def load(self):
+        """設定ファイルを読み込む。壊れている場合は空の状態にしてから例外を投げる"""
+        try:
+            if os.path.exists(self.app_json):
+                with open(self.app_json, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                    self.app_groups = data.get("app_groups", {})
+                    self.last_active_tab = data.get("last_active_tab")
+                    self.group_settings = data.get("group_settings", {})
+                    self.resource_interval = data.get("resource_sample_interval", 2.0)
+                    self.schedules = data.get("schedules", {})
+            else:
+                self.app_groups = {}
+                self.last_active_tab = None
+        except (json.JSONDecodeError, TypeError):
+            self.app_groups = {}
+            self.last_active_tab = None
+            raise
+        finally:
+            self.last_saved_text = self.serialize()
+
+    def serialize(self):
+        data = {
+            "app_groups": self.app_groups,
+            "last_active_tab": self.last_active_tab,
+            "group_settings": self.group_settings,
+            "resource_sample_interval": self.resource_interval,
+            "schedules": self.schedules
+        }
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def save(self):
+        """設定を書き込む。内容が前回と同じなら書き込まずに False を返す"""
+        text = self.serialize()
+        if text == self.last_saved_text:
+            return False
+        write_text_atomic(self.app_json, text)
+        self.last_saved_text = text
+        return True
+
+    # --- 起動 ---
+    def resolve_target(self, app_path):
+        if app_path.lower().endswith('.lnk'):
+            target = self.lnk_cache.resolve(app_path)
+            self.lnk_cache.save()
+            return target
+        return app_path
+
+    def launch_process(self, app_path):
+        """アプリを起動して Popen を返す（フォルダの場合はエクスプローラーで開いて None を返す）"""
+        if app_path.startswith(FOLDER_PREFIX):
+            subprocess.Popen(['explorer', app_path[len(FOLDER_PREFIX):]])
+            return None
+        return subprocess.Popen([self.resolve_target(app_path)])
+
+    def run_single_app(self, tab_name, app_path):
+        start = time.perf_counter()
+        try:
+            proc = self.launch_process(app_path)
+            self.record_launch(tab_name, app_path, proc, time.perf_counter() - start)
+        except Exception as e:
+            self.record_launch(tab_name, app_path, e, time.perf_counter() - start)
+
+    def record_launch(self, tab_name, app_path, result, latency):
+        """起動結果を状態一覧に記録する"""
+        if tab_name not in self.app_status:
+            self.app_status[tab_name] = []
+
+        if isinstance(result, Exception):
+            self.app_status[tab_name].append({'name': app_path, 'status': f'起動失敗: {result}', 'target_path': None,
+                                              'track_key': None, 'row_id': self.new_row_id(), 'latency': latency})
+        elif result is not None:
+            self.app_status[tab_name].append({
+                'name': app_path, 
+                'status': '起動中',
+                'target_path': result.args[0], # launch_process が解決済みのパス（ここで .lnk を読み直さない）
+                'track_key': self.process_tracker.track(result),
+                'row_id': self.new_row_id(),
+                'latency': latency
+            })
+
+    def new_row_id(self):
+        row_id = f"row{self.next_row_id}"
+        self.next_row_id += 1
+        return row_id
+
+    def start_group_launch(self, tab_name, deliver):
+        """グループを別スレッドで一括起動する。起動できない場合は理由を ValueError で知らせる"""
+        apps = list(self.app_groups.get(tab_name, []))
+        if not apps:
+            raise ValueError(f"{tab_name}に登録されたアプリがありません。")
+        if tab_name in self.group_launching:
+            raise ValueError(f"{tab_name}は一括起動中です。")
+
+        settings = self.group_settings.get(tab_name, {})
+        depends = settings.get("depends", {})
+        GroupLauncher.plan(apps, depends)
+
+        def on_result(app, result, latency):
+            def apply():
+                self.record_launch(tab_name, app, result, latency)
+                if launcher.cancelled.is_set():
+                    self.stop_group(tab_name) # 停止の指示より後に起動し終えたものも止める
+            deliver(apply)
+
+        launcher = GroupLauncher(
+            self.launch_process,
+            on_result,
+            concurrency=settings.get("concurrency", 1),
+            wait_ready=settings.get("wait_ready", True),
+            ready_timeout=settings.get("ready_timeout", 15.0),
+        )
+
+        def finished():
+            if self.group_launching.get(tab_name) is launcher:
+                del self.group_launching[tab_name]
+
+        def run():
+            try:
+                launcher.run(apps, depends)
+            finally:
+                deliver(finished)
+
+        self.group_launching[tab_name] = launcher
+        threading.Thread(target=run, daemon=True).start()
+
+    # --- 終了 ---
+    def _cancel_launch(self, tab_name):
+        """一括起動中なら残りの起動をやめる"""
+        launcher = self.group_launching.get(tab_name)
+        if launcher is not None:
+            launcher.cancel()
+
+    def _running_apps(self, tab_name):
+        return [
+            app for app in self.app_status.get(tab_name, []) 
+            if app['status'] == '起動中' and app.get('track_key')
+        ]
+
+    def _terminate_apps(self, apps_to_kill, timeout):
+        """プロセスツリーを並列に終了し、アプリごとの所要時間(秒)を row_id をキーにして返す（どのスレッドから呼んでもよい）"""
+        timings = {}
+        with ThreadPoolExecutor(max_workers=min(8, len(apps_to_kill))) as executor:
+            futures = {app['row_id']: executor.submit(self.process_tracker.terminate, app['track_key'], timeout) for app in apps_to_kill}
+            for app in apps_to_kill:
+                try:
+                    timings[app['row_id']] = futures[app['row_id']].result()
+                except Exception as e:
+                    print(f"プロセス終了中にエラー: {app['name']}: {e}")
+
+        for app in apps_to_kill:
+            if app['row_id'] in timings:
+                print(f"終了: {os.path.basename(app['name'])} ({timings[app['row_id']]:.2f}秒)")
+        return timings
+
+    def kill_group(self, tab_name, deliver=None, on_done=None, timeout=3.0, status='タイマー終了'):
+        """
+        タブから起動したプロセスツリーだけを別スレッドで終了し、対象の件数を返す（終了を待たない）。
+        状態はすぐ status にする。終了し終えたら deliver(func) 経由で on_done([(表示名, 秒数)]) を呼ぶ。
+        """
+        self._cancel_launch(tab_name)
+        apps_to_kill = self._running_apps(tab_name)
+        for app in apps_to_kill:
+            app['status'] = status
+
+        def run():
+            timings = self._terminate_apps(apps_to_kill, timeout) if apps_to_kill else {}
+            if on_done is not None:
+                results = [(display_name(app['name']), timings[app['row_id']]) for app in apps_to_kill if app['row_id'] in timings]
+                deliver(lambda: on_done(results))
+
+        if apps_to_kill or on_done is not None:
+            threading.Thread(target=run, daemon=True).start()
+        return len(apps_to_kill)
+
+    def stop_group(self, tab_name, timeout=3.0):
+        """状態をすぐ「停止」にして終了処理を別スレッドで行い、対象の件数を返す（終了を待たない）"""
+        return self.kill_group(tab_name, timeout=timeout, status='停止')
+
+    # --- 状態 ---
+    def start_tracker_polling(self, deliver, interval=1.0):
+        """
+        プロセス追跡の確認(psutil)を別スレッドで interval 秒ごとに行い、
+        終了などのイベントがあれば deliver で持ち主のスレッドに渡して apply_tracker_events で反映する。
+        """
+        def run():
+            while not self.tracker_stop.wait(interval):
+                events = self.process_tracker.poll()
+                if events:
+                    deliver(lambda events=events: self.apply_tracker_events(events))
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop_tracker_polling(self):
+        self.tracker_stop.set()
+
+    def apply_tracker_events(self, events):
+        """プロセス追跡のイベントをアプリの状態に反映する（持ち主のスレッドで呼ぶ）。状態が変わったら True を返す"""
+        changed = False
+        for event, key in events:
+            if event != 'exit':
+                continue
+            for apps in self.app_status.values():
+                for app in apps:
+                    if app.get('track_key') == key and app['status'] == '起動中':
+                        app['status'] = 'ユーザー終了'
+                        changed = True
+        return changed
+
+    def status_rows(self):
+        """状態一覧の行を、起動中→終了済みの順に並べて返す"""
+        rows = []
+        for tab, apps in self.app_status.items():
+            for a in apps:
+                rows.append({'tab': tab, 'path': a['name'], 'name': display_name(a['name']), 'status': a['status'],
+                             'row_id': a['row_id'], 'latency': a.get('latency')})
+        rows.sort(key=lambda x: STATUS_PRIORITY.get(x['status'], len(STATUS_PRIORITY)))
+        return rows
+
+    # --- 外部からの操作 ---
+    def handle_command(self, command, deliver):
+        """ControlServer で受け取ったコマンドを実行して応答を返す（持ち主のスレッドで呼ぶ）"""
+        name = command.get("command")
+        if name == "status":
+            return {"ok": True, "groups": list(self.app_groups), "launching": sorted(self.group_launching),
+                    "apps": self.status_rows()}
+
+        group = command.get("group")
+        if name not in ("launch", "stop"):
+            return {"ok": False, "error": f"不明なコマンドです: {name}"}
+        if group not in self.app_groups:
+            return {"ok": False, "error": f"グループ「{group}」はありません。"}
+        if name == "launch":
+            try:
+                self.start_group_launch(group, deliver)
+            except ValueError as e:
+                return {"ok": False, "error": str(e)}
+            return {"ok": True}
+        return {"ok": True, "stopped": self.stop_group(group)}
@@ -4,6 +4,8 @@ import sys
 
 import time
 
+import math
+
 import subprocess
 
 from datetime import datetime
@@ -132,6 +134,14 @@ class SnippingToolWrapper:
 
         
 
+        # 遅延キャプチャの予約 (予約ID -> afterのID)
+
+        self.pending_captures = {}
+
+        self.capture_seq = 0
+
+        
+
         self.setup_ui()
 
         self.setup_hotkeys()
@@ -532,9 +542,9 @@ class SnippingToolWrapper:
 
         # 通常のホットキー
 
-        keyboard.add_hotkey(self.hotkey_fullscreen, self.capture_fullscreen)
+        keyboard.add_hotkey(self.hotkey_fullscreen, lambda: self.root.after(0, self.capture_fullscreen))
 
-        keyboard.add_hotkey(self.hotkey_region, self.capture_region)
+        keyboard.add_hotkey(self.hotkey_region, lambda: self.root.after(0, self.capture_region))
 
         
 
@@ -674,13 +684,13 @@ class SnippingToolWrapper:
 
                 # 長押し → 範囲選択
 
-                self.capture_region()
+                self.root.after(0, self.capture_region)
 
             else:
 
                 # 単押し → 全画面
 
-                self.capture_fullscreen()
+                self.root.after(0, self.capture_fullscreen)
 
     
 
@@ -692,22 +702,75 @@ class SnippingToolWrapper:
 
         
 
-        # 遅延がある場合は待機
+        # 遅延がある場合はタイマーで予約する（UIを止めない）
 
         delay = self.fullscreen_delay.get()
 
         if delay > 0:
 
-            self.update_status(f"キャプチャまで {delay} 秒待機中...")
+            self.capture_seq += 1
+
+            self.countdown_capture(self.capture_seq, time.monotonic() + delay)
+
+            return
+
+        
+
+        self.capture_fullscreen_now()
+
+    
+
+    def countdown_capture(self, capture_id, deadline):
+
+        """予約した全画面キャプチャのカウントダウン"""
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+
+            self.pending_captures.pop(capture_id, None)
+
+            self.capture_fullscreen_now()
 
-            for i in range(delay, 0, -1):
+            return
+
+        
 
-                self.update_status(f"キャプチャまで {i} 秒...")
+        # 初回の呼び出しではまだ自分が登録されていないので、自分以外を数える
+        other_count = sum(1 for other_id in self.pending_captures if other_id != capture_id)
 
-                time.sleep(1)
+        others = f" (他 {other_count} 件)" if other_count else ""
+
+        self.update_status(f"キャプチャまで {math.ceil(remaining)} 秒...{others}")
 
         
 
+        # 次の秒の境目で再表示
+
+        wait = remaining - math.floor(remaining) or 1.0
+
+        self.pending_captures[capture_id] = self.root.after(max(1, int(wait * 1000)), lambda: self.countdown_capture(capture_id, deadline))
+
+    
+
+    def cancel_pending_captures(self, _=None):
+
+        """予約中の全画面キャプチャをすべてキャンセル"""
+
+        for after_id in self.pending_captures.values():
+
+            self.root.after_cancel(after_id)
+
+        self.pending_captures.clear()
+
+        self.update_status("予約キャプチャをキャンセルしました")
+
+    
+
+    def capture_fullscreen_now(self):
+
+        """全画面キャプチャを即座に実行"""
+
         self.update_status("全画面キャプチャ中...")
 
         
@@ -1072,9 +1135,11 @@ class SnippingToolWrapper:
 
         menu = (
 
-            item('全画面キャプチャ', self.capture_fullscreen),
+            item('全画面キャプチャ', lambda: self.root.after(0, self.capture_fullscreen)),
+
+            item('範囲選択キャプチャ', lambda: self.root.after(0, self.capture_region)),
 
-            item('範囲選択キャプチャ', self.capture_region),
+            item('予約キャプチャをキャンセル', lambda: self.root.after(0, self.cancel_pending_captures)),
 
             item('ウィンドウを表示', self.show_window),
 
@@ -7,39 +7,430 @@ from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
-import keyboard
-import pyperclip
-from PIL import ImageGrab, Image
-import win32clipboard
-import win32con
+import argparse
+from PIL import ImageGrab, Image, ImageChops, ImageTk, ImageEnhance
 from io import BytesIO
-import pystray
-from pystray import MenuItem as item
 from PIL import Image as PilImage
-import winsound
 import json
+import hashlib
+import math
+import queue
+import sqlite3
+
+# Windows専用のライブラリ（ベンチマーク実行時など、GUIを使わない環境では無くても動かす）
+try:
+    import keyboard
+    import pyperclip
+    import win32clipboard
+    import win32con
+    import pystray
+    from pystray import MenuItem as item
+    import winsound
+except ImportError as e:
+    print(f"GUI用ライブラリが読み込めません（ヘッドレス実行のみ可能）: {e}")
+    keyboard = pyperclip = win32clipboard = win32con = pystray = item = winsound = None
+
+
+class PillowCaptureBackend:
+    """Pillow の ImageGrab で実際の画面を取得するキャプチャバックエンド"""
+    name = "pillow"
+
+    def grab(self, bbox=None):
+        return ImageGrab.grab(bbox=bbox)
+
+
+class ReplayCaptureBackend:
+    """
+    保存済みの画像ファイルを順番に返すキャプチャバックエンド。
+    デスクトップの無い環境でのテストやベンチマーク用。
+    """
+    name = "replay"
+
+    def __init__(self, source, loop=True):
+        source = Path(source)
+        if source.is_dir():
+            self.files = sorted(p for p in source.iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp"))
+        else:
+            self.files = [source]
+        if not self.files:
+            raise ValueError(f"再生する画像がありません: {source}")
+        self.loop = loop
+        self.index = 0
+        self.cache = {}  # 同じファイルを何度も読み込まないようにする
+
+    def grab(self, bbox=None):
+        if self.index >= len(self.files):
+            if not self.loop:
+                return None
+            self.index = 0
+        path = self.files[self.index]
+        self.index += 1
+
+        frame = self.cache.get(path)
+        if frame is None:
+            with Image.open(path) as img:
+                frame = img.convert("RGB")
+            self.cache[path] = frame
+        return frame.crop(bbox) if bbox else frame.copy()
+
+
+def create_capture_backend(name, source=None):
+    """設定値からキャプチャバックエンドを作成する"""
+    if name == "replay":
+        return ReplayCaptureBackend(source)
+    return PillowCaptureBackend()
+
+
+class FrameDiffer:
+    """
+    キャプチャ同士の差分を検出するクラス。
+    元の解像度のRGBのハッシュで直前のキャプチャとの重複を判定し、
+    最後に全体保存したキャプチャ（基準画像）に対する変更領域（ダーティ矩形）をタイル単位で求める。
+    縮小したグレースケール画像は変更タイルの候補を素早く見つけるためだけに使い、
+    候補にならなかったタイルは元の解像度で比べて確かめる。
+    """
+    def __init__(self, scale=4, tile_size=64, full_save_ratio=0.5):
+        self.scale = scale                      # 比較用の縮小率
+        self.tile_size = tile_size              # 差分タイルの大きさ（元画像のピクセル単位）
+        self.full_save_ratio = full_save_ratio  # 変更面積がこの割合を超えたら全体を保存
+        self.previous = {}                      # capture_type -> (size, 縮小画像, ハッシュ, RGB画像)  直前のキャプチャ（重複判定用）
+        self.bases = {}                         # capture_type -> 同上  差分の基準にする全体保存済みのキャプチャ
+
+    def signature(self, image):
+        """候補タイル探し用の縮小グレースケール画像と、元の解像度のRGBのハッシュを返す"""
+        small, digest, _ = self._signature(image)
+        return small, digest
+
+    def _signature(self, image):
+        rgb = image if image.mode == "RGB" else image.convert("RGB")
+        small = rgb.convert("L").reduce(self.scale)
+        return small, hashlib.md5(rgb.tobytes()).hexdigest(), rgb
+
+    def compare(self, image, capture_type):
+        """
+        直前のキャプチャおよび基準画像と比較する。
+        戻り値: (直前と同じか, 状態, ダーティ矩形のリスト)
+          状態は基準画像に対するもので "first"（基準画像なし）/ "same"（基準画像と同じ）/ "changed" / "full"（大部分が変化）
+          ダーティ矩形は基準画像と1ピクセルでも違うタイルをすべて含むので、基準画像に重ねれば元のキャプチャに戻せる
+        """
+        small, digest, rgb = self._signature(image)
+        current = (image.size, small, digest, rgb)
+        prev = self.previous.get(capture_type)
+        self.previous[capture_type] = current
+        duplicate = prev is not None and prev[0] == image.size and prev[2] == digest
+
+        base = self.bases.get(capture_type)
+        if base is None or base[0] != image.size:
+            return duplicate, "first", []
+        if base[2] == digest:
+            return duplicate, "same", []
+
+        boxes = self.dirty_boxes(base, current)
+        dirty_area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes)
+        if not boxes or dirty_area > image.size[0] * image.size[1] * self.full_save_ratio:
+            return duplicate, "full", []
+        return duplicate, "changed", boxes
+
+    def set_base(self, capture_type):
+        """直前に compare したキャプチャを差分の基準にする（そのキャプチャを全体保存するときに呼ぶ）"""
+        self.bases[capture_type] = self.previous[capture_type]
+
+    def forget_base(self, capture_type):
+        self.bases.pop(capture_type, None)
+
+    def dirty_boxes(self, base, current):
+        """
+        基準画像からタイル単位の変更矩形を求める（元画像の座標で返す）。
+        縮小画像の差分に変化があるタイルは変更あり。無いタイルも、縮小で消える小さな変化や
+        明るさの同じ色への変化があり得るので、元の解像度のRGBのバイト列を比べて確かめる。
+        """
+        size, base_small, _, base_rgb = base
+        _, small, _, rgb = current
+        diff = ImageChops.difference(base_small, small)
+        step = max(1, self.tile_size // self.scale)
+        unit = step * self.scale
+        cols = (size[0] + unit - 1) // unit
+        rows = (size[1] + unit - 1) // unit
+
+        # 行ごとに連続した変更タイルをまとめる
+        runs = []
+        for row in range(rows):
+            start = None
+            for col in range(cols + 1):
+                dirty = False
+                if col < cols:
+                    tile = (col * step, row * step, min((col + 1) * step, small.width), min((row + 1) * step, small.height))
+                    box = (col * unit, row * unit, min((col + 1) * unit, size[0]), min((row + 1) * unit, size[1]))
+                    dirty = (diff.crop(tile).getbbox() is not None
+                             or base_rgb.crop(box).tobytes() != rgb.crop(box).tobytes())
+                if dirty and start is None:
+                    start = col
+                elif not dirty and start is not None:
+                    runs.append((row, start, col))
+                    start = None
+
+        # 上下に同じ範囲で続く行をまとめる
+        merged = []
+        for row, c1, c2 in runs:
+            for box in merged:
+                if box[1] == c1 and box[2] == c2 and box[3] == row:
+                    box[3] = row + 1
+                    break
+            else:
+                merged.append([row, c1, c2, row + 1])
+
+        return [
+            (c1 * unit, r1 * unit, min(c2 * unit, size[0]), min(r2 * unit, size[1]))
+            for r1, c1, c2, r2 in merged
+        ]
+
+    def reset(self):
+        self.previous.clear()
+        self.bases.clear()
+
+
+class CaptureIndex:
+    """
+    保存したスクリーンショットの履歴を SQLite に記録するクラス。
+    小さなサムネイルも一緒に保存するので、PNGファイルを開かずに履歴を一覧できる。
+    """
+    THUMBNAIL_SIZE = (96, 54)
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.local = threading.local()  # スレッドごとに接続を持つ
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS captures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                capture_type TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                hash TEXT,
+                thumbnail BLOB
+            )
+        """)
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            self.local.conn = conn
+        return conn
+
+    @classmethod
+    def make_thumbnail(cls, image):
+        """サムネイルをJPEGのバイト列にする"""
+        thumb = image.convert("RGB")
+        thumb.thumbnail(cls.THUMBNAIL_SIZE)
+        output = BytesIO()
+        thumb.save(output, "JPEG", quality=70)
+        return output.getvalue()
+
+    def add(self, path, capture_type, image, digest):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO captures (path, created_at, capture_type, width, height, hash, thumbnail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(path), datetime.now().isoformat(timespec="seconds"), capture_type,
+             image.width, image.height, digest, self.make_thumbnail(image))
+        )
+        conn.commit()
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+
+    def page(self, before_id=None, limit=50):
+        """新しい順に limit 件を返す。before_id より古いものだけを対象にする（キーセットページング）"""
+        sql = "SELECT id, path, created_at, capture_type, width, height, thumbnail FROM captures"
+        params = ()
+        if before_id is not None:
+            sql += " WHERE id < ?"
+            params = (before_id,)
+        sql += " ORDER BY id DESC LIMIT ?"
+        return self._connect().execute(sql, params + (limit,)).fetchall()
+
+
+class CaptureHistoryWindow(tk.Toplevel):
+    """キャプチャ履歴をサムネイル付きでページ送り表示するウィンドウ"""
+    PAGE_SIZE = 50
+
+    def __init__(self, parent, capture_index):
+        super().__init__(parent.root)
+        self.title("キャプチャ履歴")
+        self.geometry("520x600")
+        self.capture_index = capture_index
+        self.page_starts = [None]  # 各ページの before_id（戻る用）
+        self.photos = []  # PhotoImage がGCされないよう保持
+        self.paths = {}
+
+        style = ttk.Style(self)
+        style.configure("History.Treeview", rowheight=CaptureIndex.THUMBNAIL_SIZE[1] + 6)
+        cols = ("日時", "種類", "サイズ")
+        self.tree = ttk.Treeview(self, columns=cols, show="tree headings", style="History.Treeview")
+        self.tree.column("#0", width=CaptureIndex.THUMBNAIL_SIZE[0] + 30, stretch=False)
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=120)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<Double-1>", self.open_selected)
+
+        nav = ttk.Frame(self, padding=5)
+        nav.pack(fill=tk.X)
+        ttk.Button(nav, text="← 新しい", command=self.prev_page).pack(side=tk.LEFT)
+        ttk.Button(nav, text="古い →", command=self.next_page).pack(side=tk.RIGHT)
+        self.info_var = tk.StringVar()
+        ttk.Label(nav, textvariable=self.info_var).pack(side=tk.LEFT, expand=True)
+
+        self.show_page()
+
+    def show_page(self):
+        rows = self.capture_index.page(self.page_starts[-1], self.PAGE_SIZE)
+        self.tree.delete(*self.tree.get_children())
+        self.photos.clear()
+        self.paths.clear()
+        for row_id, path, created_at, capture_type, width, height, thumbnail in rows:
+            photo = ""
+            if thumbnail:
+                photo = ImageTk.PhotoImage(Image.open(BytesIO(thumbnail)))
+                self.photos.append(photo)
+            iid = self.tree.insert("", "end", image=photo, values=(created_at.replace("T", " "), capture_type, f"{width}x{height}"))
+            self.paths[iid] = path
+        self.last_id = rows[-1][0] if rows else None
+        self.has_next = len(rows) == self.PAGE_SIZE
+        self.info_var.set(f"{len(self.page_starts)} ページ目 / 全 {self.capture_index.count()} 件")
+
+    def next_page(self):
+        if self.has_next and self.last_id is not None:
+            self.page_starts.append(self.last_id)
+            self.show_page()
+
+    def prev_page(self):
+        if len(self.page_starts) > 1:
+            self.page_starts.pop()
+            self.show_page()
+
+    def open_selected(self, event=None):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        path = self.paths.get(selection[0])
+        if path and os.path.exists(path):
+            os.startfile(path)
+        else:
+            messagebox.showinfo("キャプチャ履歴", "ファイルが見つかりません。", parent=self)
+
+
+class CaptureScheduler:
+    """
+    遅延キャプチャ・定期キャプチャを Tk のタイマー(after)で管理するクラス。
+    イベントループを止めずに複数の予約を保持し、キャンセルとカウントダウン表示に対応する。
+    """
+    def __init__(self, root, on_countdown=None):
+        self.root = root
+        self.on_countdown = on_countdown  # 残り秒数が変わった時に呼ばれる (予約一覧を受け取る)
+        self.jobs = {}
+        self.next_id = 1
+
+    def schedule(self, delay, callback, interval=0, label=""):
+        """delay 秒後に callback を実行する。interval > 0 なら以後 interval 秒ごとに繰り返す"""
+        job_id = self.next_id
+        self.next_id += 1
+        self.jobs[job_id] = {
+            "deadline": time.monotonic() + delay,
+            "callback": callback,
+            "interval": interval,
+            "label": label,
+            "after_id": None,
+        }
+        self._tick(job_id)
+        return job_id
+
+    def cancel(self, job_id):
+        job = self.jobs.pop(job_id, None)
+        if job and job["after_id"]:
+            self.root.after_cancel(job["after_id"])
+        self._notify()
+        return job is not None
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def pending(self):
+        """(ジョブID, ラベル, 残り秒数) のリストを締め切り順で返す"""
+        now = time.monotonic()
+        jobs = sorted(self.jobs.items(), key=lambda kv: kv[1]["deadline"])
+        return [(job_id, job["label"], max(0, math.ceil(job["deadline"] - now))) for job_id, job in jobs]
+
+    def _tick(self, job_id):
+        job = self.jobs.get(job_id)
+        if not job:
+            return
+        job["after_id"] = None
+        remaining = job["deadline"] - time.monotonic()
+
+        if remaining <= 0:
+            if job["interval"] > 0:
+                # 締め切りを基準に次回を決めるので、遅れが積み重ならない
+                job["deadline"] += job["interval"] * max(1, math.ceil(-remaining / job["interval"]))
+            else:
+                del self.jobs[job_id]
+            try:
+                job["callback"]()
+            except Exception as e:
+                print(f"予約キャプチャの実行エラー: {e}")
+            if job_id not in self.jobs:
+                self._notify()
+                return
+            remaining = job["deadline"] - time.monotonic()
+
+        self._notify()
+        # 次の秒の境目（または締め切り）で再度起こす
+        wait = remaining - math.floor(remaining) or 1.0
+        job["after_id"] = self.root.after(max(1, int(wait * 1000)), lambda: self._tick(job_id))
+
+    def _notify(self):
+        if self.on_countdown:
+            self.on_countdown(self.pending())
 
 
 class SelectionWindow(tk.Toplevel):
     """
     範囲選択用のオーバーレイウィンドウを管理するクラス。
+    frozen_frame を渡した場合は、その画像を静止画として表示し、選択範囲をメモリ上で切り出す
+    （切り出しでコピーされるのは選択範囲の分だけ）。
     """
-    def __init__(self, parent):
+    def __init__(self, parent, frozen_frame=None):
         super().__init__(parent.root)
         self.parent = parent
         self.screen_width = self.winfo_screenwidth()
         self.screen_height = self.winfo_screenheight()
+        self.frozen_frame = frozen_frame
+        self.frozen_photo = None
 
-        # ウィンドウの初期設定
-        self.attributes('-alpha', 0.3)
+        # ウィンドウの初期設定（静止画表示時は不透明にする）
+        self.attributes('-alpha', 1.0 if frozen_frame else 0.3)
         self.attributes('-fullscreen', True)
         self.attributes('-topmost', True)
         self.overrideredirect(True)
 
         # マウスイベントとキーボードイベントのバインド
-        self.canvas = tk.Canvas(self, cursor="cross", bg="gray")
+        self.canvas = tk.Canvas(self, cursor="cross", bg="gray", highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
+        # 静止画を画面サイズに縮小し、少し暗くして表示
+        if frozen_frame:
+            display = frozen_frame
+            if display.size != (self.screen_width, self.screen_height):
+                display = display.resize((self.screen_width, self.screen_height), Image.BILINEAR)
+            display = ImageEnhance.Brightness(display).enhance(0.7)
+            self.frozen_photo = ImageTk.PhotoImage(display)
+            self.canvas.create_image(0, 0, image=self.frozen_photo, anchor="nw")
+
         # 座標を格納する変数
         self.start_x = None
         self.start_y = None
@@ -84,8 +475,14 @@ class SelectionWindow(tk.Toplevel):
         self.withdraw()  # ウィンドウを一時的に非表示にする
         
         try:
-            # 実際のスクリーンショットを撮る
-            screenshot = ImageGrab.grab(bbox=(x1, y1, x2, y2))
+            if self.frozen_frame:
+                # 開いた時に撮った画像から切り出す（再キャプチャしない）。
+                # crop は選択範囲のピクセルだけを新しい画像にコピーする（画面全体はコピーしない）。
+                # 保存・ハッシュ・クリップボードで使うので、コピーせずに参照だけ渡すことはしない
+                screenshot = self.frozen_frame.crop(self.to_frame_box(x1, y1, x2, y2))
+            else:
+                # 実際のスクリーンショットを撮る
+                screenshot = self.parent.capture_backend.grab(bbox=(x1, y1, x2, y2))
             self.parent.process_screenshot(screenshot, "region")
         except Exception as e:
             self.parent.update_status(f"スクリーンショット失敗: {e}")
@@ -93,6 +490,16 @@ class SelectionWindow(tk.Toplevel):
         self.parent.show_window() # メインウィンドウを再表示
         self.destroy()
 
+    def to_frame_box(self, x1, y1, x2, y2):
+        """画面座標を静止画のピクセル座標に変換する（高DPI環境では画像の方が大きい）"""
+        frame_w, frame_h = self.frozen_frame.size
+        sx = frame_w / self.screen_width
+        sy = frame_h / self.screen_height
+        return (
+            max(0, round(x1 * sx)), max(0, round(y1 * sy)),
+            min(frame_w, round(x2 * sx)), min(frame_h, round(y2 * sy))
+        )
+
     def cancel_selection(self, event=None):
         """Escキーで選択をキャンセル"""
         self.destroy()
@@ -101,7 +508,7 @@ class SelectionWindow(tk.Toplevel):
 
 
 class SnippingToolWrapper:
-    def __init__(self):
+    def __init__(self, capture_backend=None):
         self.root = tk.Tk()
         self.root.title("スクリーンショット補助ツール")
         self.root.geometry("350x700")
@@ -116,9 +523,15 @@ class SnippingToolWrapper:
             "copy_to_clipboard": True,
             "play_sound": True,
             "fullscreen_delay": 0,
+            "capture_interval": 0,  # 定期キャプチャの間隔 (秒)
             "minimize_on_startup": True,  # 起動時にタスクトレイに最小化する設定を追加
             "sound_file": "C:\\Users\\kuron\\Desktop\\gemini_test\\Cuckoo_Clock01-01_Denoise-Short_.wav",
-            "icon_file": ""
+            "icon_file": "",
+            "skip_duplicate_frames": False,  # 前回と同じ画面ならスキップ
+            "save_dirty_regions": False,  # 変更部分だけを切り出して保存
+            "freeze_frame_region": True,  # 範囲選択時に画面を静止画にする
+            "capture_backend": "pillow",  # "pillow" または "replay"
+            "replay_source": ""  # replay 時に読み込む画像フォルダ
         }
         
         # 設定読み込み
@@ -133,9 +546,31 @@ class SnippingToolWrapper:
         self.copy_to_clipboard = tk.BooleanVar(value=self.config["copy_to_clipboard"])
         self.play_sound = tk.BooleanVar(value=self.config["play_sound"])
         self.fullscreen_delay = tk.IntVar(value=self.config["fullscreen_delay"])
+        self.capture_interval = tk.IntVar(value=self.config["capture_interval"])
         self.minimize_on_startup = tk.BooleanVar(value=self.config["minimize_on_startup"])
         self.sound_file = self.config["sound_file"]
         self.icon_file = self.config["icon_file"]
+        self.skip_duplicate_frames = tk.BooleanVar(value=self.config["skip_duplicate_frames"])
+        self.save_dirty_regions = tk.BooleanVar(value=self.config["save_dirty_regions"])
+        self.freeze_frame_region = tk.BooleanVar(value=self.config["freeze_frame_region"])
+
+        # キャプチャバックエンド（引数で指定がなければ設定から作成）
+        if capture_backend is None:
+            try:
+                capture_backend = create_capture_backend(self.config["capture_backend"], self.config["replay_source"])
+            except ValueError as e:
+                print(f"キャプチャバックエンドの作成エラー: {e}")
+                capture_backend = PillowCaptureBackend()
+        self.capture_backend = capture_backend
+
+        # 保存処理は別スレッドで行い、履歴インデックスも更新する
+        self.capture_index = CaptureIndex(self.config_file.parent / "captures.db")
+        self.save_queue = queue.Queue()
+        threading.Thread(target=self.save_worker, daemon=True).start()
+
+        # 重複フレーム検出用
+        self.frame_differ = FrameDiffer()
+        self.last_full_files = {}  # capture_type -> 最後に全体保存したファイル名
 
         # アイコン設定
         icon_to_set = self.icon_file if self.icon_file and os.path.exists(self.icon_file) else self.resource_path("screenshot_icon.ico")
@@ -149,6 +584,10 @@ class SnippingToolWrapper:
         self.key_press_time = None
         self.long_press_threshold = 0.5  # 0.5秒以上で長押し
         
+        # 遅延・定期キャプチャの予約
+        self.capture_scheduler = CaptureScheduler(self.root, on_countdown=self.show_countdown)
+        self.interval_job = None
+
         # タスクトレイアイコン
         self.icon = None
         self.setup_ui()
@@ -188,9 +627,13 @@ class SnippingToolWrapper:
             "copy_to_clipboard": self.copy_to_clipboard.get(),
             "play_sound": self.play_sound.get(),
             "fullscreen_delay": self.fullscreen_delay.get(),
+            "capture_interval": self.capture_interval.get(),
             "minimize_on_startup": self.minimize_on_startup.get(),
             "sound_file": self.sound_file,
-            "icon_file": self.icon_file
+            "icon_file": self.icon_file,
+            "skip_duplicate_frames": self.skip_duplicate_frames.get(),
+            "save_dirty_regions": self.save_dirty_regions.get(),
+            "freeze_frame_region": self.freeze_frame_region.get()
         })
         
         try:
@@ -231,6 +674,11 @@ class SnippingToolWrapper:
                     command=self.capture_fullscreen, width=20).grid(row=0, column=0, pady=5)
         ttk.Button(button_frame, text="範囲選択キャプチャ", 
                     command=self.capture_region, width=20).grid(row=1, column=0, pady=5)
+        self.interval_button = ttk.Button(button_frame, text="定期キャプチャ開始", 
+                    command=self.toggle_interval_capture, width=20)
+        self.interval_button.grid(row=2, column=0, pady=5)
+        ttk.Button(button_frame, text="予約をすべてキャンセル", 
+                    command=self.cancel_scheduled_captures, width=20).grid(row=3, column=0, pady=5)
         
         # クイック設定
         quick_settings = ttk.LabelFrame(main_tab, text="クイック設定", padding="10")
@@ -272,6 +720,10 @@ class SnippingToolWrapper:
         ttk.Scale(delay_frame, from_=0, to=10, variable=self.fullscreen_delay, 
                     orient="horizontal", length=200).grid(row=0, column=1, padx=5)
         ttk.Label(delay_frame, textvariable=self.fullscreen_delay).grid(row=0, column=2, padx=5)
+
+        ttk.Label(delay_frame, text="定期キャプチャの間隔 (秒):").grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(delay_frame, from_=1, to=3600, textvariable=self.capture_interval, 
+                    width=8).grid(row=1, column=1, sticky=tk.W, padx=5)
         
         # 効果音設定
         sound_frame = ttk.LabelFrame(settings_tab, text="効果音設定", padding="10")
@@ -312,6 +764,12 @@ class SnippingToolWrapper:
         
         ttk.Checkbutton(action_frame, text="起動時にタスクトレイに最小化", 
                         variable=self.minimize_on_startup).grid(row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Checkbutton(action_frame, text="変化のない画面は保存しない", 
+                        variable=self.skip_duplicate_frames).grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Checkbutton(action_frame, text="変更部分のみ保存（マニフェスト付き）", 
+                        variable=self.save_dirty_regions).grid(row=2, column=0, sticky=tk.W, pady=5)
+        ttk.Checkbutton(action_frame, text="範囲選択時に画面を静止させる", 
+                        variable=self.freeze_frame_region).grid(row=3, column=0, sticky=tk.W, pady=5)
 
         # アイコン設定
         icon_frame = ttk.LabelFrame(settings_tab, text="アイコン設定", padding="10")
@@ -369,12 +827,12 @@ class SnippingToolWrapper:
         # 通常のホットキー
         if self.hotkey_fullscreen:
             try:
-                keyboard.add_hotkey(self.hotkey_fullscreen, self.capture_fullscreen, suppress=True)
+                keyboard.add_hotkey(self.hotkey_fullscreen, lambda: self.root.after(0, self.capture_fullscreen), suppress=True)
             except (ValueError, KeyError) as e:
                 print(f"全画面用の無効なホットキー: {self.hotkey_fullscreen}, エラー: {e}")
         if self.hotkey_region:
             try:
-                keyboard.add_hotkey(self.hotkey_region, self.capture_region, suppress=True)
+                keyboard.add_hotkey(self.hotkey_region, lambda: self.root.after(0, self.capture_region), suppress=True)
             except (ValueError, KeyError) as e:
                 print(f"範囲選択用の無効なホットキー: {self.hotkey_region}, エラー: {e}")
 
@@ -428,34 +886,87 @@ class SnippingToolWrapper:
     
     
     def capture_fullscreen(self):
-        """全画面キャプチャ"""
+        """全画面キャプチャ（遅延がある場合はタイマーで予約する）"""
         self.update_status("全画面キャプチャ準備中...")
         
-        # 遅延がある場合は待機
+        # 遅延がある場合は予約して即座に戻る（UIを止めない）
         delay = self.fullscreen_delay.get()
         if delay > 0:
-            self.update_status(f"キャプチャまで {delay} 秒待機中...")
-            time.sleep(delay)
-        
+            self.capture_scheduler.schedule(delay, self.capture_fullscreen_now, label="全画面")
+            return
+
+        self.capture_fullscreen_now()
+
+    def capture_fullscreen_now(self):
+        """全画面キャプチャを即座に実行"""
         self.update_status("全画面キャプチャ中...")
         
         # スクリーンショットを取得
-        screenshot = ImageGrab.grab()
+        screenshot = self.capture_backend.grab()
         
         # 保存とクリップボード処理
         self.process_screenshot(screenshot, "fullscreen")
+
+    def toggle_interval_capture(self):
+        """定期キャプチャの開始/停止を切り替える"""
+        if self.interval_job is not None:
+            self.capture_scheduler.cancel(self.interval_job)
+            self.interval_job = None
+            self.interval_button.config(text="定期キャプチャ開始")
+            self.update_status("定期キャプチャを停止しました")
+            return
+
+        interval = self.capture_interval.get()
+        if interval <= 0:
+            messagebox.showinfo("定期キャプチャ", "キャプチャの間隔を1秒以上に設定してください。")
+            return
+        self.interval_job = self.capture_scheduler.schedule(interval, self.capture_fullscreen_now, interval=interval, label="定期")
+        self.interval_button.config(text="定期キャプチャ停止")
+
+    def cancel_scheduled_captures(self, _=None):
+        """予約中のキャプチャをすべてキャンセル"""
+        self.capture_scheduler.cancel_all()
+        self.interval_job = None
+        self.interval_button.config(text="定期キャプチャ開始")
+        self.update_status("予約キャプチャをキャンセルしました")
+
+    def show_countdown(self, pending):
+        """予約中のキャプチャの残り時間をステータスバーに表示"""
+        if not pending:
+            return
+        _, label, remaining = pending[0]
+        others = f" (他 {len(pending) - 1} 件)" if len(pending) > 1 else ""
+        self.status_var.set(f"{label}キャプチャまで {remaining} 秒...{others}")
         
     def capture_region(self):
         """範囲選択キャプチャ（独自実装）"""
         self.update_status("範囲選択モード起動中...")
         self.root.withdraw() # メインウィンドウを非表示にする
-        self.selection_window = SelectionWindow(self)
+
+        # 静止画モードではオーバーレイを出す前に一度だけ画面を撮る
+        frozen_frame = None
+        if self.freeze_frame_region.get():
+            self.root.update_idletasks()
+            try:
+                frozen_frame = self.capture_backend.grab()
+            except Exception as e:
+                print(f"静止画の取得に失敗しました（通常モードで続行）: {e}")
+        self.selection_window = SelectionWindow(self, frozen_frame)
     
     def process_screenshot(self, screenshot, capture_type):
         """スクリーンショットの処理"""
         if not screenshot:
             self.update_status("スクリーンショットの取得に失敗しました")
             return
+
+        # 前回のキャプチャとの重複・基準画像との差分を確認
+        compared = self.skip_duplicate_frames.get() or self.save_dirty_regions.get()
+        frame_state, dirty_boxes = "first", []
+        if compared:
+            duplicate, frame_state, dirty_boxes = self.frame_differ.compare(screenshot, capture_type)
+            if duplicate and self.skip_duplicate_frames.get():
+                self.update_status("画面に変化がないため保存をスキップしました")
+                return
             
         # クリップボードにコピー
         if self.copy_to_clipboard.get():
@@ -466,15 +977,19 @@ class SnippingToolWrapper:
             filename = self.generate_filename(capture_type)
             filepath = self.save_folder / filename
             
-            # フォルダが存在しない場合は作成
-            self.save_folder.mkdir(parents=True, exist_ok=True)
-            
-            # 保存
-            screenshot.save(filepath, "PNG")
-            self.update_status(f"保存完了: {filename}")
-            
-            # プレビューウィンドウを表示（任意）
-            self.show_notification(f"スクリーンショット保存: {filename}", str(filepath))
+            # 保存はワーカースレッドに任せる（変更部分のみ保存が有効なら基準画像からの差分を切り出して保存）
+            base_file = self.last_full_files.get(capture_type)
+            if self.save_dirty_regions.get() and frame_state in ("changed", "same") and base_file:
+                self.save_queue.put((screenshot, filepath, capture_type, base_file, dirty_boxes))
+            else:
+                self.save_queue.put((screenshot, filepath, capture_type, None, None))
+                # 全体保存したキャプチャを以後の差分の基準にする（比較していなければ基準を捨てる）
+                self.last_full_files[capture_type] = filename
+                if compared:
+                    self.frame_differ.set_base(capture_type)
+                else:
+                    self.frame_differ.forget_base(capture_type)
+            self.update_status(f"保存中: {filename}")
         else:
             self.update_status("キャプチャ完了（クリップボードにコピー）")
             
@@ -482,6 +997,61 @@ class SnippingToolWrapper:
         if self.play_sound.get():
             self.play_capture_sound()
     
+    def save_worker(self):
+        """保存キューを処理するワーカースレッド（PNGエンコード・書き込み・履歴登録）"""
+        while True:
+            screenshot, filepath, capture_type, base_file, dirty_boxes = self.save_queue.get()
+            try:
+                # フォルダが存在しない場合は作成
+                filepath.parent.mkdir(parents=True, exist_ok=True)
+                if base_file:
+                    filepath = filepath.parent / self.save_dirty_region_files(screenshot, filepath, base_file, dirty_boxes)
+                else:
+                    screenshot.save(filepath, "PNG")
+                _, digest = self.frame_differ.signature(screenshot)
+                self.capture_index.add(filepath, capture_type, screenshot, digest)
+                self.root.after(0, lambda p=filepath: self.on_saved(p))
+            except Exception as e:
+                print(f"保存エラー: {e}")
+                self.root.after(0, lambda e=e: self.update_status(f"保存に失敗しました: {e}"))
+            finally:
+                self.save_queue.task_done()
+
+    def on_saved(self, filepath):
+        """保存完了時の処理（UIスレッド）"""
+        self.update_status(f"保存完了: {filepath.name}")
+        # プレビューウィンドウを表示（任意）
+        self.show_notification(f"スクリーンショット保存: {filepath.name}", str(filepath))
+
+    def show_history(self, _=None):
+        """キャプチャ履歴ウィンドウを表示"""
+        if getattr(self, "history_window", None) and self.history_window.winfo_exists():
+            self.history_window.lift()
+            self.history_window.show_page()
+            return
+        self.history_window = CaptureHistoryWindow(self, self.capture_index)
+
+    def save_dirty_region_files(self, screenshot, filepath, base_file, dirty_boxes):
+        """
+        変更のあった矩形だけをPNGで保存し、ベース画像と各矩形の位置を記録したマニフェスト(JSON)を書き出す。
+        戻り値はマニフェストのファイル名。
+        """
+        regions = []
+        for i, box in enumerate(dirty_boxes):
+            region_name = f"{filepath.stem}_r{i}.png"
+            screenshot.crop(box).save(filepath.parent / region_name, "PNG")
+            regions.append({"file": region_name, "box": list(box)})
+
+        manifest = {
+            "base": base_file,
+            "size": list(screenshot.size),
+            "regions": regions
+        }
+        manifest_path = filepath.with_suffix(".json")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest_path.name
+
     def play_capture_sound(self):
         """キャプチャ時の効果音を鳴らす"""
         try:
@@ -575,6 +1145,9 @@ class SnippingToolWrapper:
         if folder:
             self.save_folder = Path(folder)
             self.folder_label.config(text=str(self.save_folder))
+            # 差分保存のベース画像は保存先ごとに取り直す
+            self.frame_differ.reset()
+            self.last_full_files.clear()
             self.update_status(f"保存先を変更: {self.save_folder}")
     
     def update_status(self, message):
@@ -620,8 +1193,10 @@ class SnippingToolWrapper:
             
         # アイコンメニュー
         menu = (
-            item('全画面キャプチャ', self.capture_fullscreen),
-            item('範囲選択キャプチャ', self.capture_region),
+            item('全画面キャプチャ', lambda: self.root.after(0, self.capture_fullscreen)),
+            item('範囲選択キャプチャ', lambda: self.root.after(0, self.capture_region)),
+            item('予約キャプチャをキャンセル', lambda: self.root.after(0, self.cancel_scheduled_captures)),
+            item('キャプチャ履歴', lambda: self.root.after(0, self.show_history)),
             item('ウィンドウを表示', self.show_window),
             item('終了', self.exit_app)
         )
@@ -648,6 +1223,9 @@ class SnippingToolWrapper:
         """アプリケーションを終了"""
         # 設定を保存
         self.save_config()
+
+        # 保存待ちのスクリーンショットを書き出す
+        self.save_queue.join()
         
         # キーボードフックを解除
         keyboard.unhook_all()
@@ -698,10 +1276,112 @@ class SnippingToolWrapper:
             _do_flash()
 
 
+class _Setting:
+    """tk.BooleanVar の代わりに設定値を持つ（ベンチマークでは Tk を作らない）"""
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _ImmediateRoot:
+    """root.after(0, func) をその場で呼ぶ（ベンチマークで save_worker の完了通知を受け取る）"""
+    def after(self, _ms, func):
+        func()
+
+
+class PipelineBenchmark(SnippingToolWrapper):
+    """
+    SnippingToolWrapper の process_screenshot / save_worker をそのまま動かして処理時間を計測する（GUI不要）。
+    ウィンドウ・クリップボード・効果音・ステータス表示は使わず、ファイル名だけは1秒に何枚でも重ならないよう連番にする。
+    """
+    def __init__(self, backend, save_folder, skip_duplicates=True, dirty_regions=False):
+        self.capture_backend = backend
+        self.save_folder = Path(save_folder)
+        self.root = _ImmediateRoot()
+        self.auto_save = _Setting(True)
+        self.copy_to_clipboard = _Setting(False)
+        self.play_sound = _Setting(False)
+        self.skip_duplicate_frames = _Setting(skip_duplicates)
+        self.save_dirty_regions = _Setting(dirty_regions)
+        self.capture_index = CaptureIndex(self.save_folder / "captures.db")
+        self.save_queue = queue.Queue()
+        self.frame_differ = FrameDiffer()
+        self.last_full_files = {}
+        self.queued = 0
+        self.saved = 0
+
+    def generate_filename(self, capture_type):
+        self.queued += 1
+        return f"bench_{capture_type}_{self.queued:05d}.png"
+
+    def update_status(self, message):
+        pass
+
+    def on_saved(self, filepath):
+        self.saved += 1  # save_worker のスレッドから呼ばれる（ワーカーは1つ）
+
+    def run(self, count):
+        """
+        count 枚をキャプチャして保存し終えるまでを計測する。
+        戻り値: grab_ms（キャプチャ）/ process_ms（UIスレッドでの差分判定とキュー投入）の1枚あたりの平均と、
+        保存し終えるまでを含めた1枚あたりの時間 total_ms
+        """
+        self.save_folder.mkdir(parents=True, exist_ok=True)
+        threading.Thread(target=self.save_worker, daemon=True).start()
+        grab_time = process_time = 0.0
+        done = 0
+        start = time.perf_counter()
+        for _ in range(count):
+            t0 = time.perf_counter()
+            frame = self.capture_backend.grab()
+            if frame is None:
+                break
+            t1 = time.perf_counter()
+            self.process_screenshot(frame, "fullscreen")
+            t2 = time.perf_counter()
+            grab_time += t1 - t0
+            process_time += t2 - t1
+            done += 1
+        self.save_queue.join()
+        elapsed = time.perf_counter() - start
+        frames = max(1, done)
+        return {
+            "frames": done,
+            "skipped": done - self.queued,
+            "saved": self.saved,
+            "grab_ms": grab_time / frames * 1000,
+            "process_ms": process_time / frames * 1000,
+            "total_ms": elapsed / frames * 1000,
+        }
+
+
+def run_pipeline_benchmark(backend, save_folder, count=50, dirty_regions=False):
+    """
+    キャプチャ→重複判定→PNGエンコード→保存の処理時間を、アプリと同じ処理で計測する（GUI不要）。
+    戻り値: 各工程の平均時間(ミリ秒)を含む辞書
+    """
+    return PipelineBenchmark(backend, save_folder, dirty_regions=dirty_regions).run(count)
+
+
 # 実行
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="スクリーンショット補助ツール")
+    parser.add_argument("--replay", metavar="DIR", help="画面の代わりに指定フォルダの画像をキャプチャする")
+    parser.add_argument("--benchmark", metavar="OUT_DIR", help="GUIを起動せずにキャプチャ→保存の処理時間を計測する")
+    parser.add_argument("--count", type=int, default=50, help="ベンチマークのフレーム数")
+    parser.add_argument("--dirty-regions", action="store_true", help="ベンチマークで変更部分だけを保存する")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        backend = create_capture_backend("replay" if args.replay else "pillow", args.replay)
+        result = run_pipeline_benchmark(backend, args.benchmark, args.count, args.dirty_regions)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        sys.exit(0)
+
     try:
-        app = SnippingToolWrapper()
+        app = SnippingToolWrapper(create_capture_backend("replay", args.replay) if args.replay else None)
         app.run()
     except Exception as e:
         print(f"エラーが発生しました: {e}")
@@ -0,0 +1,82 @@
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from journal_file import trim_torn_tail
+
+CLAUNHM_DEPS = ("tkinterdnd2", "pystray", "pynput", "PIL")
+
+
+class TrimTornTailTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "log")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data):
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_missing_file(self):
+        self.assertFalse(trim_torn_tail(self.path))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_complete_lines_are_kept(self):
+        self.write(b"a\nb\n")
+        self.assertFalse(trim_torn_tail(self.path))
+        self.assertEqual(self.read(), b"a\nb\n")
+
+    def test_partial_line_is_cut(self):
+        self.write(b"a\nb\n{\"op\": \"ad")
+        self.assertTrue(trim_torn_tail(self.path))
+        self.assertEqual(self.read(), b"a\nb\n")
+
+    def test_partial_line_longer_than_a_block(self):
+        self.write(b"a\n" + b"x" * 10000)
+        self.assertTrue(trim_torn_tail(self.path, block_size=64))
+        self.assertEqual(self.read(), b"a\n")
+
+    def test_only_a_partial_line(self):
+        self.write(b"xyz")
+        self.assertTrue(trim_torn_tail(self.path))
+        self.assertEqual(self.read(), b"")
+
+
+@unittest.skipUnless(all(importlib.util.find_spec(name) for name in CLAUNHM_DEPS),
+                     "claunhm.py needs its GUI libraries")
+class ConfigStoreJournalTest(unittest.TestCase):
+    def test_append_after_torn_record_survives_reload(self):
+        sys.path.insert(0, os.path.join(ROOT, "gemini_project"))
+        import claunhm
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = claunhm.ConfigStore(os.path.join(directory, "config.json"))
+            store.load()
+            with open(store.journal_path, "w", encoding="utf-8") as f:
+                f.write('{"op": "add", "category": "基本", "shortcut": {"id": "torn"')
+
+            store = claunhm.ConfigStore(store.path)
+            store.load()
+            shortcut = {"id": "after-restart", "name": "メモ", "path": "notes.txt"}
+            store.data["shortcuts"].setdefault("基本", []).append(shortcut)
+            store.append({"op": "add", "category": "基本", "shortcut": shortcut})
+
+            reloaded = claunhm.ConfigStore(store.path).load()
+            self.assertEqual(reloaded["shortcuts"], {"基本": [shortcut]})
+            with open(store.journal_path, encoding="utf-8") as f:
+                self.assertEqual([json.loads(line)["shortcut"]["id"] for line in f], ["after-restart"])
+
+
+if __name__ == "__main__":
+    unittest.main()